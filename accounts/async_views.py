@@ -0,0 +1,32 @@
+"""Async variant of ``public_profile_view``; see blog/async_views.py."""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import render
+
+from blog import pagecache
+from blog.aio import concurrently
+from blog.pagecache import cache_anonymous, tagged
+from blog.views import _atheme_context
+from . import views
+
+
+@cache_anonymous
+async def public_profile_view(request, username):
+    if request.method == 'POST':
+        # Subscribe/unsubscribe is a write; keep it on the sync path.
+        return await sync_to_async(views.public_profile_view)(request, username)
+
+    request.user = await request.auser()
+    # Profile, stats and follow state come back in one query (see
+    # views._profile_user); the grid page and theme then run side by side.
+    profile_user = await sync_to_async(views._profile_user)(request, username)
+    (page,), theme = await asyncio.gather(
+        concurrently(lambda: views._profile_posts_page(request, profile_user)),
+        _atheme_context(request),
+    )
+
+    context = views._profile_context(request, profile_user, page)
+    context.update(theme)
+    response = await sync_to_async(render)(request, 'accounts/public_profile.html', context)
+    return tagged(response, pagecache.user_tag(profile_user.pk))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts import suggestions
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the \"Suggested for you\" table from the follow graph and "
+        "tag affinity. Meant to run nightly (cron) or on demand."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=10, help="Suggestions kept per user.")
+        parser.add_argument(
+            '--max-fanout', type=int, default=25,
+            help="Follows of each followed author considered in the two-hop walk.",
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, top_k, max_fanout, batch_size, **options):
+        started = time.perf_counter()
+        written = suggestions.rebuild(top_k=top_k, max_fanout=max_fanout, batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} suggestion(s) in {time.perf_counter() - started:.1f}s."
+        ))
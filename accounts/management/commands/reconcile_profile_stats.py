@@ -0,0 +1,56 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from accounts import stats
+from accounts.models import ProfileStats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute ProfileStats (posts, followers, following, likes "
+        "received) from the underlying tables, creating missing rows and "
+        "fixing any that have drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Report drifted rows without writing.",
+        )
+
+    def handle(self, *args, batch_size, dry_run, **options):
+        counts = stats.true_counts()
+        drift = Q()
+        for field in counts:
+            drift |= ~Q(**{field: F(f'true_{field}')})
+
+        last_id = 0
+        fixed = missing = 0
+        while True:
+            batch = list(
+                User.objects.filter(pk__gt=last_id)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1]
+            existing = set(ProfileStats.objects.filter(pk__in=batch).values_list('pk', flat=True))
+            absent = [user_id for user_id in batch if user_id not in existing]
+            drifted = list(
+                ProfileStats.objects.filter(pk__in=existing)
+                .annotate(**{f'true_{field}': expr for field, expr in counts.items()})
+                .filter(drift)
+                .values_list('pk', flat=True)
+            )
+            if not dry_run and (absent or drifted):
+                stats.rebuild(absent + drifted)
+            fixed += len(drifted)
+            missing += len(absent)
+
+        verb = "would be fixed" if dry_run else "fixed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{fixed} drifted and {missing} missing profile stats row(s) {verb}."
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_profile_followers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='fanout_on_read',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
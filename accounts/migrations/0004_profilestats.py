@@ -0,0 +1,61 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_stats(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Profile = apps.get_model('accounts', 'Profile')
+    ProfileStats = apps.get_model('accounts', 'ProfileStats')
+    Post = apps.get_model('blog', 'Post')
+
+    def count(queryset, key):
+        counts = (
+            queryset.filter(**{key: OuterRef('pk')})
+            .order_by()
+            .values(key)
+            .annotate(total=Count('*'))
+            .values('total')
+        )
+        return Coalesce(Subquery(counts), 0)
+
+    ProfileStats.objects.bulk_create(
+        [ProfileStats(user_id=user_id) for user_id in User.objects.values_list('pk', flat=True).iterator()],
+        batch_size=1000,
+    )
+    ProfileStats.objects.update(
+        posts=count(Post.objects.all(), 'author'),
+        followers=count(Profile.followers.through.objects.all(), 'profile__user'),
+        following=count(Profile.followers.through.objects.all(), 'user'),
+        likes_received=count(Post.likes.through.objects.all(), 'post__author'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_profile_fanout_on_read'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('blog', '0015_media_upload_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts', models.PositiveIntegerField(default=0)),
+                ('followers', models.PositiveIntegerField(default=0)),
+                ('following', models.PositiveIntegerField(default=0)),
+                ('likes_received', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'profile stats',
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
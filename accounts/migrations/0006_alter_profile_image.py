@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:13
+
+import cloudinary.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_followsuggestion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='image',
+            field=cloudinary.models.CloudinaryField(default='v1730825368/profile_pics/default_k3mjna.jpg', max_length=255, verbose_name='image'),
+        ),
+    ]
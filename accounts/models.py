@@ -1,6 +1,6 @@
 from django.conf import settings
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_save
 from django.dispatch import receiver
 from cloudinary.models import CloudinaryField  # <-- 1. IMPORT THIS
 
@@ -29,11 +29,89 @@ class Profile(models.Model):
         blank=True
     )
 
+    # Set once an author outgrows BLOG_FANOUT_MAX_FOLLOWERS: their posts are
+    # merged into followers' timelines at read time instead of copied.
+    fanout_on_read = models.BooleanField(default=False, db_index=True)
+
     def __str__(self) -> str:
         return f'{self.user.username} Profile'
 
+
+class ProfileStats(models.Model):
+    """Denormalized counters for a user's public profile.
+
+    Kept current by the follow, post and like write paths (see
+    accounts/stats.py); `python manage.py reconcile_profile_stats` repairs
+    any drift.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts = models.PositiveIntegerField(default=0)
+    followers = models.PositiveIntegerField(default=0)
+    following = models.PositiveIntegerField(default=0)
+    likes_received = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'profile stats'
+
+    def __str__(self) -> str:
+        return f'Stats for user {self.user_id}'
+
+
+class FollowSuggestion(models.Model):
+    """One precomputed "Suggested for you" entry.
+
+    The whole table is rewritten by `python manage.py build_follow_suggestions`
+    (see accounts/suggestions.py); rows are read in ``rank`` order.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='follow_suggestions'
+    )
+    suggested = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+'
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    mutuals = models.PositiveIntegerField(default=0)  # people you follow who follow them
+    shared_tags = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'rank'], name='accounts_suggestion_user_rank_uniq'),
+        ]
+
+    def __str__(self) -> str:
+        return f'Suggest {self.suggested_id} to {self.user_id} (#{self.rank})'
+
+
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def ensure_user_profile(sender, instance, created, **kwargs):
     """Create a profile for every user and backfill missing ones."""
     Profile.objects.get_or_create(user=instance)
+    if created:
+        ProfileStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Profile)
+def invalidate_profile_pages(sender, instance, **kwargs):
+    from blog import pagecache
+    pagecache.invalidate(*pagecache.tags_for(instance))
+
+
+@receiver(m2m_changed, sender=Profile.followers.through)
+def count_follows(sender, instance, action, reverse, pk_set, **kwargs):
+    from . import stats
+    stats.follows_changed(instance, action, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=Profile.followers.through)
+def notify_followed_authors(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'post_add' and pk_set:
+        from blog import notifications
+        notifications.follows_added(instance, reverse, pk_set)
+
     
\ No newline at end of file
@@ -0,0 +1,94 @@
+from collections import Counter
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from blog import pagecache
+from blog.models import Post
+
+from .models import Profile, ProfileStats
+
+Follow = Profile.followers.through
+
+
+# -----------------------------
+#  PROFILE STATS MAINTENANCE
+# -----------------------------
+def _count(queryset, key):
+    """Correlated ``COUNT(*)`` of ``queryset`` rows whose ``key`` is the outer user."""
+    counts = (
+        queryset.filter(**{key: OuterRef('pk')})
+        .order_by()
+        .values(key)
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+def true_counts():
+    return {
+        'posts': _count(Post.objects.all(), 'author'),
+        'followers': _count(Follow.objects.all(), 'profile__user'),
+        'following': _count(Follow.objects.all(), 'user'),
+        'likes_received': _count(Post.likes.through.objects.all(), 'post__author'),
+    }
+
+
+def rebuild(user_ids) -> None:
+    """Create or recompute the stats rows of ``user_ids`` from scratch."""
+    user_ids = list(user_ids)
+    ProfileStats.objects.bulk_create(
+        [ProfileStats(user_id=user_id) for user_id in user_ids], ignore_conflicts=True
+    )
+    ProfileStats.objects.filter(pk__in=user_ids).update(**true_counts())
+
+
+def bump(user_id: int, **deltas) -> None:
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updated = ProfileStats.objects.filter(pk=user_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    pagecache.invalidate(pagecache.user_tag(user_id))
+    if not updated and any(delta > 0 for delta in deltas.values()):
+        # No row yet (e.g. a bulk-created user); the change is already in
+        # the underlying tables, so counting them gives the right answer.
+        # Decrements are skipped: they also fire while a user is deleted.
+        rebuild([user_id])
+
+
+# --- Follows (m2m_changed on Profile.followers) ---
+def _existing_pairs(instance, reverse, pk_set):
+    """(author id, follower id) rows the pending remove/clear will delete."""
+    if reverse:
+        rows = Follow.objects.filter(user=instance)
+        if pk_set is not None:
+            rows = rows.filter(profile_id__in=pk_set)
+        return [(author_id, instance.pk) for author_id in rows.values_list('profile__user_id', flat=True)]
+    rows = Follow.objects.filter(profile=instance)
+    if pk_set is not None:
+        rows = rows.filter(user_id__in=pk_set)
+    return [(instance.user_id, follower_id) for follower_id in rows.values_list('user_id', flat=True)]
+
+
+def _apply(pairs, delta):
+    for author_id, count in Counter(author_id for author_id, _ in pairs).items():
+        bump(author_id, followers=count * delta)
+    for follower_id, count in Counter(follower_id for _, follower_id in pairs).items():
+        bump(follower_id, following=count * delta)
+
+
+def follows_changed(instance, action, reverse, pk_set) -> None:
+    if action == 'post_add' and pk_set:
+        if reverse:
+            authors = Profile.objects.filter(pk__in=pk_set).values_list('user_id', flat=True)
+            _apply([(author_id, instance.pk) for author_id in authors], 1)
+        else:
+            _apply([(instance.user_id, follower_id) for follower_id in pk_set], 1)
+    elif action in ('pre_remove', 'pre_clear'):
+        # Only rows that actually exist are removed; remember them for post_*.
+        instance._removed_follows = _existing_pairs(instance, reverse, pk_set if action == 'pre_remove' else None)
+    elif action in ('post_remove', 'post_clear'):
+        _apply(instance.__dict__.pop('_removed_follows', []), -1)
@@ -1,3 +1,150 @@
-from django.test import TestCase
+import re
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from blog.models import Comment, Post, TimelineEntry
+from . import async_views, suggestions, views
+
+User = get_user_model()
+
+
+class AccountsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', password='pw')
+        self.reader = User.objects.create_user('reader', password='pw')
+        self.client.force_login(self.reader)
+
+    def add_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(author=self.author, title=f'Post {i}', body='Body')
+            post.toggle_like(self.reader)
+            post.toggle_save(self.reader)
+            Comment.objects.create(post=post, user=self.reader, body='Nice.')
+
+
+class ProfileQueryBudgetTests(AccountsTestCase):
+    """Profile pages run a fixed number of queries, however much there is to show."""
+
+    def assertBudget(self, path, budget):
+        for count in (1, 10):
+            self.add_posts(count)
+            cache.clear()
+            with self.assertNumQueries(budget):
+                response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+
+    def test_public_profile(self):
+        self.assertBudget(reverse('public_profile', args=[self.author.username]), 6)
+
+    def test_own_profile(self):
+        for tab in ('posts', 'liked', 'saved', 'comments'):
+            with self.subTest(tab=tab):
+                self.assertBudget(f"{reverse('profile')}?tab={tab}", 6)
+
+    def test_api_profile(self):
+        self.assertBudget(reverse('api_profile', args=[self.author.username]), 3)
+
+
+class FollowStatsTests(AccountsTestCase):
+    def follow(self, action):
+        return self.client.post(reverse('public_profile', args=[self.author.username]), {'action': action})
+
+    def test_subscribe_counts_and_backfills(self):
+        post = Post.objects.create(author=self.author, title='Hello', body='Body')
+        self.follow('subscribe')
+        self.author.stats.refresh_from_db()
+        self.reader.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.followers, 1)
+        self.assertEqual(self.reader.stats.following, 1)
+        self.assertTrue(TimelineEntry.objects.filter(owner=self.reader, post=post).exists())
+
+        self.follow('unsubscribe')
+        self.author.stats.refresh_from_db()
+        self.reader.stats.refresh_from_db()
+        self.assertEqual((self.author.stats.followers, self.reader.stats.following), (0, 0))
+        self.assertFalse(TimelineEntry.objects.filter(owner=self.reader).exists())
+
+    def test_profile_shows_follow_state(self):
+        self.follow('subscribe')
+        response = self.client.get(reverse('public_profile', args=[self.author.username]))
+        self.assertTrue(response.context['is_following'])
+        self.assertEqual(response.context['followers_count'], 1)
+
+
+@override_settings(BLOG_PROFILE_TAB_PAGE_SIZE=2)
+class ProfileTabTests(AccountsTestCase):
+    def test_tab_pages_cover_every_row_once(self):
+        self.add_posts(5)
+        liked = list(self.reader.liked_posts.values_list('title', flat=True))
+        seen, cursor = 0, None
+        while True:
+            response = self.client.get(reverse('profile_tab', args=['liked']), {'cursor': cursor} if cursor else {})
+            self.assertEqual(response.status_code, 200)
+            seen += len(response.context['items'])
+            cursor = response.get('X-Next-Cursor')
+            if not cursor:
+                break
+        self.assertEqual(seen, len(liked))
+
+    def test_unknown_tab_is_404(self):
+        self.assertEqual(self.client.get(reverse('profile_tab', args=['drafts'])).status_code, 404)
+
+
+class AsyncProfileViewTests(TransactionTestCase):
+    """``async_views.public_profile_view`` renders what the sync view does (see blog.tests.AsyncViewTests)."""
+
+    def test_same_render(self):
+        author = User.objects.create_user('author', password='pw')
+        reader = User.objects.create_user('reader', password='pw')
+        post = Post.objects.create(author=author, title='Post 0', body='Body')
+        for user in (AnonymousUser(), reader):
+            with self.subTest(user=user):
+                responses = []
+                for view in (views.public_profile_view, async_to_sync(async_views.public_profile_view)):
+                    cache.clear()
+                    request = RequestFactory().get('/')
+                    request.user = User.objects.get(pk=user.pk) if user.is_authenticated else user
+                    request.auser = sync_to_async(lambda: request.user)
+                    responses.append(view(request, author.username))
+                expected, actual = (
+                    re.sub(r'name="csrfmiddlewaretoken" value="[^"]*"', '', response.content.decode())
+                    for response in responses
+                )
+                self.assertIn(f'href="/post/{post.pk}/"', actual)
+                self.assertEqual(actual, expected)
+
+
+class FollowSuggestionTests(AccountsTestCase):
+    def test_friends_of_friends_ranked_by_mutuals(self):
+        edges = np.array([(1, 2), (1, 4), (2, 3), (4, 3), (2, 5), (2, 1)])
+        result = suggestions.score(edges)
+        mine = result[result['user'] == 1]
+        self.assertEqual(list(mine['suggested']), [3, 5])
+        self.assertEqual(list(mine['mutuals']), [2, 1])
+        self.assertTrue(mine['score'].is_monotonic_decreasing)
+
+    def test_tag_affinity_adds_candidates(self):
+        user_tags = pd.DataFrame(
+            [(1, 7, 3, 0), (6, 7, 5, 5)], columns=['user', 'tag', 'weight', 'authored'],
+        )
+        result = suggestions.score(np.empty((0, 2), dtype=np.int64), user_tags)
+        row = result[result['user'] == 1].iloc[0]
+        self.assertEqual((row['suggested'], row['mutuals'], row['shared_tags']), (6, 0, 1))
+
+    def test_rebuild_and_read(self):
+        third = User.objects.create_user('third', password='pw')
+        self.author.profile.followers.add(self.reader)
+        third.profile.followers.add(self.author)
+        self.assertEqual(suggestions.rebuild(), 1)
+        self.assertEqual([row.suggested for row in suggestions.suggestions_for(self.reader)], [third])
+        # Following them hides the suggestion before the next rebuild.
+        third.profile.followers.add(self.reader)
+        self.assertEqual(suggestions.suggestions_for(self.reader), [])
@@ -1,12 +1,17 @@
+from django.conf import settings
 from django.contrib.auth import views as auth_views
 from django.urls import path
 
-from . import views
+from . import async_views, views
+
+read_views = async_views if settings.BLOG_ASYNC_VIEWS else views
 
 urlpatterns = [
     path('settings/', views.settings_view, name='settings'),
     path('profile/', views.profile_view, name='profile'),
-    path('u/<str:username>/', views.public_profile_view, name='public_profile'),
+    path('profile/tab/<str:tab>/', views.profile_tab, name='profile_tab'),
+    path('u/<str:username>/', read_views.public_profile_view, name='public_profile'),
+    path('u/<str:username>/page/', views.public_profile_page, name='public_profile_page'),
 
 
     path('login/', auth_views.LoginView.as_view(template_name='registration/login.html'), name='login'),
@@ -1,20 +1,30 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import logout, update_session_auth_hash
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import PasswordChangeForm
 from django.shortcuts import redirect, render, get_object_or_404
 from django.contrib.auth.models import User
-from django.http import HttpResponse
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import Substr
+from django.http import Http404, HttpResponse
+from django.urls import reverse
 
+from blog import media, pagecache, timeline
 from blog.models import Comment, Post
+from blog.pagecache import cache_anonymous, tagged
+from blog.pagination import paginate_keyset
+from blog.views import theme_preferences
+from . import stats
 from .forms import ProfileUpdateForm, UserUpdateForm
-from .models import Profile
+from .models import Profile, ProfileStats
 
 
 def _theme_context(request):
+    active_theme, accent_color = theme_preferences(request)
     return {
-        'active_theme': request.session.get('theme', 'light'),
-        'accent_color': request.session.get('accent_color', '#ff4f70'),
+        'active_theme': active_theme,
+        'accent_color': accent_color,
         'user_profile': getattr(request.user, 'profile', None) if request.user.is_authenticated else None,
     }
 
@@ -30,7 +40,10 @@ def settings_view(request):
             p_form = PasswordChangeForm(request.user)
             if u_form.is_valid() and profile_form.is_valid():
                 u_form.save()
-                profile_form.save()
+                profile = profile_form.save(commit=False)
+                spooled = media.spool_uploads(profile, ['image'])
+                profile.save()
+                media.enqueue(profile, spooled)
                 messages.success(request, 'Profile updated successfully.')
                 return redirect('settings')
 
@@ -58,34 +71,80 @@ def settings_view(request):
     context.update(_theme_context(request))
     return render(request, 'accounts/settings.html', context)
 
-# In accounts/views.py
+# Tabs of the owner's profile page: label and empty-state text. Each tab
+# is paged separately by profile_tab, so only the open one is queried.
+PROFILE_TABS = {
+    'posts': ("Your posts", "You haven't posted yet."),
+    'liked': ("Liked", "You haven't liked any posts yet."),
+    'saved': ("Saved", "Save posts to read them later."),
+    'comments': ("Comments", "No comments yet."),
+}
+
+
+def _profile_tab_page(request, tab):
+    """One page of ``tab`` for the viewer, loading only the columns it renders."""
+    cursor = request.GET.get('cursor')
+    page_size = settings.BLOG_PROFILE_TAB_PAGE_SIZE
+    if tab == 'posts':
+        # Served by blog_post_author_idx.
+        posts = Post.objects.filter(author=request.user).only('id', 'title', 'publish')
+        return paginate_keyset(posts, cursor, page_size=page_size)
+    if tab in ('liked', 'saved'):
+        # Walk the relation rows newest first (blog_post_*_user_idx) rather
+        # than the posts, so the order is when the viewer liked or saved them.
+        through = (Post.likes if tab == 'liked' else Post.saved_by).through
+        rows = (
+            through.objects.filter(user=request.user)
+            .select_related('post__author')
+            .only('id', 'post__id', 'post__title', 'post__author__username')
+        )
+        return paginate_keyset(rows, cursor, keys=('id',), page_size=page_size)
+    comments = (
+        Comment.objects.filter(user=request.user)
+        .select_related('post')
+        .annotate(excerpt=Substr('body', 1, 80))
+        .only('id', 'created', 'post__id', 'post__title')
+    )
+    return paginate_keyset(comments, cursor, keys=('created', 'id'), page_size=page_size)
+
+
+def _tab_context(tab, page):
+    return {
+        'tab': tab,
+        'items': page.items,
+        'empty_text': PROFILE_TABS[tab][1],
+    }
+
 
 @login_required
 def profile_view(request):
     profile, _ = Profile.objects.get_or_create(user=request.user)
-    my_posts = (
-        Post.objects.filter(author=request.user)
-        .select_related('author', 'author__profile')
-        .prefetch_related('likes', 'saved_by')
-        .order_by('-publish')
-    )
-    liked_posts = request.user.liked_posts.select_related('author', 'author__profile').order_by('-publish')
-    
-    # This is the line you just fixed
-    saved_posts = request.user.saved_posts.select_related('author', 'author__profile').order_by('-publish')
-
-    # THIS IS YOUR ERROR LINE (line 74)
-    # Make sure it is NOT indented extra. It must align perfectly
-    # with 'saved_posts', 'liked_posts', and 'my_posts'.
-    user_comments = Comment.objects.filter(user=request.user).select_related('post').order_by('-created')
-
+    tab = request.GET.get('tab')
+    if tab not in PROFILE_TABS:
+        tab = 'posts'
+    page = _profile_tab_page(request, tab)
     context = {
         'profile': profile,
-        'my_posts': my_posts,
-        # ... etc ...
+        'tabs': [(name, label) for name, (label, _) in PROFILE_TABS.items()],
+        'next_cursor': page.next_cursor,
+        **_tab_context(tab, page),
     }
     context.update(_theme_context(request))
     return render(request, 'accounts/profile.html', context)
+
+
+@login_required
+def profile_tab(request, tab):
+    """One page of a profile tab only, for switching tabs and "load more"."""
+    if tab not in PROFILE_TABS:
+        raise Http404
+    page = _profile_tab_page(request, tab)
+    response = render(request, 'accounts/profile_tab_items.html', _tab_context(tab, page))
+    if page.next_cursor:
+        response['X-Next-Cursor'] = page.next_cursor
+    return response
+
+
 def logout_view(request):
     logout(request)
     messages.info(request, "You have successfully logged out.")
@@ -94,57 +153,78 @@ def logout_view(request):
 
 # --- THIS IS THE NEW, COMPLETE FUNCTION ---
 
+def _profile_user(request, username):
+    """The profile owner with profile, stats and the viewer's follow state in one query."""
+    users = User.objects.select_related('profile', 'stats')
+    if request.user.is_authenticated:
+        users = users.annotate(viewer_follows=Exists(
+            Profile.followers.through.objects.filter(profile__user=OuterRef('pk'), user=request.user)
+        ))
+    profile_user = get_object_or_404(users, username=username)
+    if not hasattr(profile_user, 'profile'):
+        profile_user.profile, _ = Profile.objects.get_or_create(user=profile_user)
+    if not hasattr(profile_user, 'stats'):
+        stats.rebuild([profile_user.pk])
+        profile_user.stats = ProfileStats.objects.get(pk=profile_user.pk)
+    return profile_user
+
+
+def _profile_posts_page(request, profile_user):
+    # The grid only needs the media and title; served by blog_post_author_idx.
+    posts = Post.objects.filter(author=profile_user).only('pk', 'title', 'image', 'video', 'publish')
+    return paginate_keyset(posts, request.GET.get('cursor'), page_size=settings.BLOG_PROFILE_PAGE_SIZE)
+
+
+def _profile_context(request, profile_user, page):
+    return {
+        'profile_user': profile_user,  # The user whose profile is being viewed
+        'profile': profile_user.profile,
+        'stats': profile_user.stats,
+        'posts': page.items,
+        'next_cursor': page.next_cursor,
+        'feed_url': reverse('public_profile', kwargs={'username': profile_user.username}),
+        'feed_page_url': reverse('public_profile_page', kwargs={'username': profile_user.username}),
+        'is_self': request.user == profile_user,
+        'is_following': getattr(profile_user, 'viewer_follows', False),
+        'posts_count': profile_user.stats.posts,
+        'followers_count': profile_user.stats.followers,
+        'following_count': profile_user.stats.following,
+    }
+
+
+@cache_anonymous
 def public_profile_view(request, username):
-    # 1. Get the user object for the profile being viewed
-    profile_user = get_object_or_404(User, username=username)
-    profile, _ = Profile.objects.get_or_create(user=profile_user)
-    
-    # 2. Get their posts
-    posts = Post.objects.filter(author=profile_user).order_by('-publish')
-    
-    # 3. Handle Subscribe/Unsubscribe logic (if a form was submitted)
+    profile_user = _profile_user(request, username)
+
+    # Handle Subscribe/Unsubscribe logic (if a form was submitted)
     if request.method == 'POST':
         if not request.user.is_authenticated:
             # Send unauthenticated users to the login page
             return redirect(f"{reverse('login')}?next={request.path}")
-            
+
+        # Follower/following counts are updated by the m2m_changed receiver.
         action = request.POST.get('action')
         if action == 'subscribe':
-            profile.followers.add(request.user)
+            profile_user.profile.followers.add(request.user)
+            timeline.follow(request.user, profile_user)
         elif action == 'unsubscribe':
-            profile.followers.remove(request.user)
-        
+            profile_user.profile.followers.remove(request.user)
+            timeline.unfollow(request.user, profile_user)
+
         # Redirect back to the same page to avoid re-posting
         return redirect('public_profile', username=username)
 
-    # 4. Prepare context data for the template
-    is_self = (request.user == profile_user)
-    is_following = False
-    if request.user.is_authenticated:
-        # Check if the *logged-in user* is in the *profile's* follower list
-        is_following = profile.followers.filter(id=request.user.id).exists()
+    context = _profile_context(request, profile_user, _profile_posts_page(request, profile_user))
+    context.update(_theme_context(request))
+    response = render(request, 'accounts/public_profile.html', context)
+    return tagged(response, pagecache.user_tag(profile_user.pk))
 
-    posts_count = posts.count()
-    followers_count = profile.followers.count()
-    
-    # This counts how many *other* people the 'profile_user' is following.
-    # This assumes your 'Profile' model has a 'followers' ManyToManyField.
-    # This query finds all profiles that the 'profile_user' is a follower *of*.
-    following_count = Profile.objects.filter(followers=profile_user).count()
 
-    context = {
-        'profile_user': profile_user,  # The user whose profile is being viewed
-        'profile': profile,
-        'posts': posts,
-        'is_self': is_self,
-        'is_following': is_following,
-        'posts_count': posts_count,
-        'followers_count': followers_count,
-        'following_count': following_count,
-    }
-    context.update(_theme_context(request))
-    
-    # 5. Render the template you provided
-    # (Make sure you saved your template as 'public_profile.html'
-    # in 'accounts/templates/accounts/')
-    return render(request, 'accounts/public_profile.html', context)
\ No newline at end of file
+def public_profile_page(request, username):
+    """Next page of the profile grid only, for infinite scroll."""
+    profile_user = get_object_or_404(User, username=username)
+    page = _profile_posts_page(request, profile_user)
+    response = render(request, 'accounts/public_profile_tiles.html', {'posts': page.items})
+    if page.next_cursor:
+        response['X-Next-Cursor'] = page.next_cursor
+    return response
@@ -1,24 +1,197 @@
-from django.contrib import admin
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Count, F
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import pagecache
 from .models import Post, Comment, Story  # <-- 1. ADDED 'Story' HERE
 
+
+# -----------------------------
+#  ADMIN HELPERS FOR LARGE TABLES
+# -----------------------------
+class EstimatedCountPaginator(Paginator):
+    """Paginator that trusts Postgres' row estimates.
+
+    ``COUNT(*)`` reads every row on Postgres. An unfiltered changelist uses
+    the table statistics in ``pg_class.reltuples``; a filtered one uses the
+    planner's estimate for its query. When that is above
+    BLOG_ADMIN_EXACT_COUNT_LIMIT rows it is used as-is; the last page may
+    then come up slightly short. Smaller results, other databases, and any
+    failure to get an estimate fall back to the exact count.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if connections[queryset.db].vendor == 'postgresql':
+            try:
+                with transaction.atomic(using=queryset.db):
+                    estimate = self._estimate(queryset)
+            except (DatabaseError, LookupError, TypeError, ValueError):
+                estimate = None
+            if estimate is not None and estimate > settings.BLOG_ADMIN_EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
+
+    @staticmethod
+    def _estimate(queryset):
+        connection = connections[queryset.db]
+        if not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                    [connection.ops.quote_name(queryset.model._meta.db_table)],
+                )
+                row = cursor.fetchone()
+            # reltuples is -1 until the table is first vacuumed or analyzed.
+            return int(row[0]) if row and row[0] >= 0 else None
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        if isinstance(plan, list):
+            plan = plan[0]
+        return int(plan['Plan']['Plan Rows'])
+
+
+class AutocompleteListFilter(admin.FieldListFilter):
+    """Filter on a foreign key through the admin's select2 autocomplete.
+
+    The stock RelatedFieldListFilter renders one link per related row; this
+    renders a single search box backed by the related model admin's
+    ``search_fields``. Use as ``list_filter = [('author', AutocompleteListFilter)]``.
+    """
+    template = 'admin/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.lookup_val = (self.used_parameters.get(self.lookup_kwarg) or [None])[-1]
+        self.admin_site_name = model_admin.admin_site.name
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def get_facet_counts(self, pk_attname, filtered_qs):
+        return {}
+
+    def choices(self, changelist):
+        selected = None
+        if self.lookup_val:
+            selected = self.field.related_model._default_manager.filter(
+                **{self.field.target_field.name: self.lookup_val}
+            ).first()
+        yield {
+            'selected': selected is not None,
+            'value': self.lookup_val if selected else '',
+            'display': str(selected) if selected else '',
+            'lookup_kwarg': self.lookup_kwarg,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+            'url': reverse(f'{self.admin_site_name}:autocomplete'),
+            'app_label': self.field.model._meta.app_label,
+            'model_name': self.field.model._meta.model_name,
+            'field_name': self.field.name,
+        }
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist defaults for tables too big to count or list in full."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+    @property
+    def media(self):
+        media = super().media
+        for entry in self.list_filter:
+            if isinstance(entry, (list, tuple)) and issubclass(entry[1], AutocompleteListFilter):
+                field = self.model._meta.get_field(entry[0])
+                return media + AutocompleteSelect(field, self.admin_site).media
+        return media
+
+
+def chunked_pks(queryset, size):
+    """Yield lists of ``queryset``'s primary keys, walking the pk index."""
+    last = None
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    while True:
+        chunk = list((pks.filter(pk__gt=last) if last is not None else pks)[:size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+
+
 # --- This is your existing Post admin (no changes) ---
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(LargeTableAdmin):
     list_display = ['title', 'author', 'publish', 'created']
-    list_filter = ['author', 'publish', 'created']
+    list_filter = [('author', AutocompleteListFilter), 'publish', 'created']
+    list_select_related = ['author']
     search_fields = ['title', 'body']
     date_hierarchy = 'publish'
+    autocomplete_fields = ['author']
 
 # --- This is your existing Comment admin (no changes) ---
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = ['name', 'email', 'post', 'created', 'active']
     list_filter = ['active', 'created']
+    list_select_related = ['post']
     search_fields = ['name', 'email', 'body']
-    raw_id_fields = ['post']
+    raw_id_fields = ['post', 'user']
+    actions = ['activate_comments', 'deactivate_comments']
+
+    def _set_active(self, queryset, active):
+        """Flip ``active`` in chunks, keeping Post.comment_count in step."""
+        changed = 0
+        for chunk in chunked_pks(queryset.filter(active=not active), settings.BLOG_ADMIN_BATCH_SIZE):
+            per_post = (
+                Comment.objects.filter(pk__in=chunk).values('post_id')
+                .annotate(n=Count('pk')).order_by()
+            )
+            posts_by_delta = defaultdict(list)
+            for row in per_post:
+                posts_by_delta[row['n'] if active else -row['n']].append(row['post_id'])
+            changed += Comment.objects.filter(pk__in=chunk).update(active=active)
+            for delta, post_ids in posts_by_delta.items():
+                Post.objects.filter(pk__in=post_ids).update(
+                    comment_count=F('comment_count') + delta, version=F('version') + 1
+                )
+            pagecache.invalidate(*[
+                pagecache.post_tag(post_id) for post_ids in posts_by_delta.values() for post_id in post_ids
+            ])
+        return changed
+
+    @admin.action(description="Activate selected comments", permissions=['change'])
+    def activate_comments(self, request, queryset):
+        changed = self._set_active(queryset, True)
+        self.message_user(request, f"Activated {changed} comment(s).", messages.SUCCESS)
+
+    @admin.action(description="Deactivate selected comments", permissions=['change'])
+    def deactivate_comments(self, request, queryset):
+        changed = self._set_active(queryset, False)
+        self.message_user(request, f"Deactivated {changed} comment(s).", messages.SUCCESS)
 
 # --- 2. ADDED THIS NEW BLOCK FOR STORIES ---
 @admin.register(Story)
-class StoryAdmin(admin.ModelAdmin):
+class StoryAdmin(LargeTableAdmin):
     list_display = ('author', 'created_at', 'expires_at')
-    list_filter = ('author', 'created_at', 'expires_at')
\ No newline at end of file
+    list_filter = (('author', AutocompleteListFilter), 'created_at', 'expires_at')
+    list_select_related = ('author',)
+    autocomplete_fields = ('author',)
+    actions = ('purge_expired_stories',)
+
+    @admin.action(description="Purge expired stories among the selected", permissions=['delete'])
+    def purge_expired_stories(self, request, queryset):
+        deleted = 0
+        expired = queryset.filter(expires_at__lte=timezone.now())
+        for chunk in chunked_pks(expired, settings.BLOG_ADMIN_BATCH_SIZE):
+            deleted += Story.objects.filter(pk__in=chunk).delete()[0]
+        self.message_user(request, f"Purged {deleted} expired story(ies).", messages.SUCCESS)
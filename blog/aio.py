@@ -0,0 +1,36 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+
+from .metrics import record_queries
+
+
+# -----------------------------
+#  CONCURRENT ORM HELPERS
+# -----------------------------
+# Django's async ORM methods (aget, acount, ...) all funnel through one
+# thread-sensitive executor, so awaiting several of them with gather()
+# still runs the SQL one statement at a time. `concurrently` instead runs
+# each independent unit of ORM work on its own worker thread, and therefore
+# its own database connection, so the queries genuinely overlap.
+#
+# Those threads belong to the executor, not to the request, so
+# request_finished never closes their connections. Each task closes them
+# itself when it ends (with DATABASE_POOL, that returns them to the pool)
+# rather than leaving one open per idle thread.
+
+
+def _in_worker(func):
+    def call():
+        try:
+            with record_queries():
+                return func()
+        finally:
+            connections.close_all()
+    return sync_to_async(call, thread_sensitive=False)
+
+
+async def concurrently(*funcs):
+    """Run zero-argument blocking callables in parallel; return their results."""
+    return await asyncio.gather(*[_in_worker(func)() for func in funcs])
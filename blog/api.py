@@ -0,0 +1,240 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+from django.views.decorators.http import require_safe
+
+from accounts.views import _profile_user
+
+from .annotations import annotate_viewer_state
+from .interactions import pending_toggles
+from .media import get_uploader
+from .models import MediaStatus, Post, Story
+from .pagination import paginate_keyset
+from .search import search_posts
+from .views import _comments_page, _feed_posts, _story_tray
+
+User = get_user_model()
+
+
+# -----------------------------
+#  READ-ONLY JSON API (v1)
+# -----------------------------
+# Mounted at /api/v1/ for the mobile client; authenticated through the
+# normal session cookie. Serializers are plain functions over rows loaded
+# with select_related, so a page never issues per-object queries.
+#
+# Every response carries a strong ETag computed from what the page is built
+# from (ids, Post.updated and Post.version, which every counter change
+# bumps) plus the viewer. The ETag is checked before viewer state is loaded
+# or anything is serialized, so a matching If-None-Match costs only the page
+# query and returns 304.
+
+
+# --- Serializers ---
+def _image(image, preset):
+    if not image:
+        return None
+    return get_uploader().image_sources(image, settings.BLOG_IMAGE_PRESETS[preset]['widths'])
+
+
+def serialize_user(user) -> dict:
+    profile = getattr(user, 'profile', None)
+    return {
+        'username': user.username,
+        'name': user.get_full_name(),
+        'avatar': _image(profile.image, 'avatar') if profile else None,
+    }
+
+
+def serialize_post(post, *, detail=False) -> dict:
+    data = {
+        'id': post.pk,
+        'title': post.title,
+        'author': serialize_user(post.author),
+        'publish': post.publish.isoformat(),
+        'updated': post.updated.isoformat(),
+        'media_status': post.media_status,
+        'image': _image(post.image, 'detail' if detail else 'tile'),
+        'video': post.video.url if post.video else None,
+        'likes': post.like_count,
+        'saves': post.save_count,
+        'comments': post.comment_count,
+        'liked': getattr(post, 'user_liked', False),
+        'saved': getattr(post, 'user_saved', False),
+        'url': reverse('post_detail', args=[post.pk]),
+    }
+    if detail:
+        data['body'] = post.body
+        data['tags'] = [tag.name for tag in post.tags.all()]
+    else:
+        data['excerpt'] = Truncator(strip_tags(post.body)).chars(160)
+    return data
+
+
+def serialize_comment(comment) -> dict:
+    return {
+        'id': comment.pk,
+        'author': serialize_user(comment.user) if comment.user else {'username': None, 'name': comment.name},
+        'body': comment.body,
+        'created': comment.created.isoformat(),
+    }
+
+
+def serialize_story(story) -> dict:
+    return {
+        'id': story.pk,
+        'author': serialize_user(story.author),
+        'image': _image(story.image, 'story'),
+        'created': story.created_at.isoformat(),
+        'expires': story.expires_at.isoformat(),
+    }
+
+
+def serialize_profile(user) -> dict:
+    return {
+        **serialize_user(user),
+        'posts': user.stats.posts,
+        'followers': user.stats.followers,
+        'following': user.stats.following,
+        'likes_received': user.stats.likes_received,
+        'viewer_follows': getattr(user, 'viewer_follows', False),
+        'url': reverse('public_profile', kwargs={'username': user.username}),
+    }
+
+
+# --- Conditional responses ---
+def _user_tag(user) -> tuple:
+    profile = getattr(user, 'profile', None)
+    return user.pk, user.username, user.get_full_name(), str(profile.image) if profile else ''
+
+
+def _post_tag(post) -> tuple:
+    return post.pk, post.version, post.updated.timestamp(), _user_tag(post.author)
+
+
+def _pending_tag(request, posts) -> list:
+    """The viewer's unflushed like/save toggles on ``posts``, overlaid on the body."""
+    if not request.user.is_authenticated:
+        return []
+    pending = pending_toggles(request.user, [post.pk for post in posts])
+    return sorted((post_id, sorted(kinds)) for post_id, kinds in pending.items())
+
+
+def _etag(request, *parts) -> str:
+    viewer = request.user.pk if request.user.is_authenticated else None
+    digest = hashlib.blake2b(repr((viewer, request.get_full_path(), parts)).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def _respond(request, etag, build) -> HttpResponse:
+    """304 when ``etag`` matches If-None-Match, otherwise ``build()`` as JSON."""
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(build(), json_dumps_params={'separators': (',', ':')})
+    response['ETag'] = etag
+    # Always revalidate; bodies depend on the viewer's session.
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def _post_page(request, page) -> HttpResponse:
+    def build():
+        annotate_viewer_state(page.items, request.user)
+        return {
+            'results': [serialize_post(post) for post in page.items],
+            'next_cursor': page.next_cursor,
+        }
+    tags = [_post_tag(post) for post in page.items]
+    return _respond(request, _etag(request, page.next_cursor, tags, _pending_tag(request, page.items)), build)
+
+
+# --- Views ---
+@require_safe
+def feed(request: HttpRequest) -> HttpResponse:
+    return _post_page(request, _feed_posts(request))
+
+
+@require_safe
+def search(request: HttpRequest) -> HttpResponse:
+    """Posts matching ``?q=``, best match first."""
+    page = search_posts(
+        request.GET.get('q', '').strip(), request.GET.get('cursor'), page_size=settings.BLOG_FEED_PAGE_SIZE,
+    )
+    return _post_page(request, page)
+
+
+@require_safe
+def post_detail(request: HttpRequest, pk: int) -> HttpResponse:
+    post = get_object_or_404(Post.objects.select_related('author', 'author__profile'), pk=pk)
+
+    def build():
+        annotate_viewer_state([post], request.user)
+        return serialize_post(post, detail=True)
+    return _respond(request, _etag(request, _post_tag(post), _pending_tag(request, [post])), build)
+
+
+@require_safe
+def post_comments(request: HttpRequest, pk: int) -> HttpResponse:
+    post = get_object_or_404(Post.objects.only('id', 'version', 'updated'), pk=pk)
+    page = _comments_page(post.pk, request.GET.get('cursor'))
+    tags = [(comment.pk, comment.updated.timestamp(), comment.user and _user_tag(comment.user))
+            for comment in page.items]
+    return _respond(request, _etag(request, post.version, page.next_cursor, tags), lambda: {
+        'results': [serialize_comment(comment) for comment in page.items],
+        'next_cursor': page.next_cursor,
+    })
+
+
+def _story_response(request, stories) -> HttpResponse:
+    tags = [(story.pk, str(story.image), story.expires_at.timestamp(), _user_tag(story.author))
+            for story in stories]
+    return _respond(request, _etag(request, tags), lambda: {
+        'results': [serialize_story(story) for story in stories],
+    })
+
+
+@require_safe
+def story_tray(request: HttpRequest) -> HttpResponse:
+    """Latest active story of each author the viewer follows."""
+    return _story_response(request, _story_tray(request))
+
+
+@require_safe
+def user_stories(request: HttpRequest, username: str) -> HttpResponse:
+    author = get_object_or_404(User, username=username)
+    stories = list(
+        Story.objects.filter(
+            author=author, expires_at__gt=timezone.now(), media_status=MediaStatus.READY,
+        ).select_related('author', 'author__profile')
+    )
+    return _story_response(request, stories)
+
+
+@require_safe
+def profile(request: HttpRequest, username: str) -> HttpResponse:
+    user = _profile_user(request, username)
+    stats = user.stats
+    tag = (_user_tag(user), stats.posts, stats.followers, stats.following, stats.likes_received,
+           getattr(user, 'viewer_follows', False))
+    return _respond(request, _etag(request, tag), lambda: serialize_profile(user))
+
+
+@require_safe
+def profile_posts(request: HttpRequest, username: str) -> HttpResponse:
+    author = get_object_or_404(User, username=username)
+    page = paginate_keyset(
+        Post.objects.filter(author=author).select_related('author', 'author__profile'),
+        request.GET.get('cursor'),
+        page_size=settings.BLOG_FEED_PAGE_SIZE,
+    )
+    return _post_page(request, page)
+
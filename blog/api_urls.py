@@ -0,0 +1,15 @@
+from django.urls import path
+
+from . import api
+
+# Mounted at /api/v1/ by blog_project/urls.py; see docs/api.md.
+urlpatterns = [
+    path('feed/', api.feed, name='api_feed'),
+    path('search/', api.search, name='api_search'),
+    path('posts/<int:pk>/', api.post_detail, name='api_post_detail'),
+    path('posts/<int:pk>/comments/', api.post_comments, name='api_post_comments'),
+    path('stories/', api.story_tray, name='api_story_tray'),
+    path('users/<str:username>/', api.profile, name='api_profile'),
+    path('users/<str:username>/posts/', api.profile_posts, name='api_profile_posts'),
+    path('users/<str:username>/stories/', api.user_stories, name='api_user_stories'),
+]
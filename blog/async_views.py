@@ -0,0 +1,66 @@
+"""Async variants of the read-heavy blog views.
+
+Routed in place of the sync views when ``BLOG_ASYNC_VIEWS`` is on (see
+docs/asgi.md). Independent queries are issued concurrently through
+``blog.aio.concurrently``; template rendering stays synchronous.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpRequest, HttpResponse
+from django.shortcuts import render
+
+from . import pagecache
+from .aio import concurrently
+from .annotations import aannotate_viewer_state
+from .forms import CommentForm
+from .models import Post
+from .pagecache import cache_anonymous, tagged
+from .tags import trending_tags
+from .views import (
+    _atheme_context, _comments_context, _comments_page, _feed_context, _feed_posts, _story_tray, _suggestions,
+)
+
+
+@cache_anonymous
+async def post_list(request: HttpRequest) -> HttpResponse:
+    request.user = await request.auser()
+    (page, stories, tags, suggestions), theme = await asyncio.gather(
+        concurrently(
+            lambda: _feed_posts(request),
+            lambda: _story_tray(request),
+            trending_tags,
+            lambda: _suggestions(request),
+        ),
+        _atheme_context(request),
+    )
+    await aannotate_viewer_state(page.items, request.user)
+
+    context = _feed_context(request, page, "post_list", stories, tags, suggestions)
+    context.update(theme)
+    response = await sync_to_async(render)(request, "blog/post_list.html", context)
+    return tagged(response, *pagecache.feed_tags(page.items))
+
+
+@cache_anonymous
+async def post_detail(request: HttpRequest, pk: int) -> HttpResponse:
+    request.user = await request.auser()
+    try:
+        post = await Post.objects.select_related("author", "author__profile").aget(pk=pk)
+    except Post.DoesNotExist:
+        raise Http404("No Post matches the given query.")
+
+    (comments,), theme, _ = await asyncio.gather(
+        concurrently(lambda: _comments_page(post.pk, request.GET.get("comments"))),
+        _atheme_context(request),
+        aannotate_viewer_state([post], request.user),
+    )
+
+    context = {
+        "post": post,
+        "comment_form": CommentForm(),
+    }
+    context.update(_comments_context(post, comments))
+    context.update(theme)
+    response = await sync_to_async(render)(request, "blog/post_detail.html", context)
+    return tagged(response, pagecache.post_tag(post.pk), pagecache.user_tag(post.author_id))
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Backends whose entries are only visible to the process that wrote them.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_shared() -> bool:
+    """Whether every web and worker process sees the same default cache."""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if cache_is_shared():
+        return []
+    return [Error(
+        "The default cache is local to each process.",
+        hint=(
+            "Page-cache invalidation, fragment locks, pending like/save flags and "
+            "unread counts must reach every worker; set CACHE_URL to a shared "
+            "Redis instance (see docs/caching.md)."
+        ),
+        id='blog.E001',
+    )]
@@ -0,0 +1,10 @@
+from django.utils.functional import SimpleLazyObject
+
+
+def unread_notifications(request):
+    """``unread_notifications`` for the header badge, read only if rendered."""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {'unread_notifications': 0}
+    from .notifications import unread_count
+    return {'unread_notifications': SimpleLazyObject(lambda: unread_count(user))}
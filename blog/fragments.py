@@ -0,0 +1,88 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
+from django.utils.safestring import mark_safe
+
+from .metrics import record_cache
+
+
+# -----------------------------
+#  VERSIONED FRAGMENT CACHE
+# -----------------------------
+# Viewer-neutral HTML for a post is cached under its id and Post.version, so
+# any change that bumps the version simply makes the old entry unreachable.
+# The author's name and avatar are rendered into the same HTML but live on
+# other rows, so a digest of them is part of the key too: a profile edit
+# moves every tile of that author to a new key without touching the posts.
+# Viewer-specific pieces are rendered per request into <!--slot:name-->
+# markers left in the cached HTML.
+#
+# The single-flight lock is a cache.add(), so it only keeps other workers
+# out when the cache is shared between them (CACHE_URL in settings).
+
+LOCK_TIMEOUT = 10  # seconds a rebuild may hold the single-flight lock
+LOCK_WAIT = 0.5  # seconds a losing worker waits for the winner's result
+LOCK_POLL = 0.025
+
+
+def _author_digest(post) -> str:
+    """Short digest of the author fields a fragment renders."""
+    author = post.author
+    profile = post.author_profile
+    fields = (author.username, author.get_full_name(), str(profile.image) if profile else '')
+    return hashlib.blake2b(repr(fields).encode(), digest_size=6).hexdigest()
+
+
+def fragment_key(kind: str, post) -> str:
+    return f'blog:{kind}:{post.pk}:v{post.version}:a{_author_digest(post)}'
+
+
+def single_flight(key: str, build):
+    """Return the cached value at ``key``, letting only one worker build it.
+
+    Workers that lose the race poll briefly for the winner's result and
+    only build it themselves (without caching) if that takes too long.
+    """
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            value = build()
+            cache.set(key, value, settings.BLOG_FRAGMENT_CACHE_TIMEOUT)
+            return value
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return build()
+
+
+def cached_fragments(kind: str, posts, build, prefetch=()) -> dict:
+    """Map post id -> cached HTML, building misses with ``build(post)``.
+
+    ``prefetch`` lookups (e.g. ``'tags'``) are only loaded for the misses,
+    so a fully cached page never touches those relations.
+    """
+    keys = {fragment_key(kind, post): post for post in posts}
+    found = cache.get_many(keys)
+    missed = [post for key, post in keys.items() if key not in found]
+    record_cache(f'fragment:{kind}', len(keys) - len(missed), len(missed))
+    if missed and prefetch:
+        prefetch_related_objects(missed, *prefetch)
+    for key, post in keys.items():
+        if key not in found:
+            found[key] = single_flight(key, lambda post=post: build(post))
+    return {post.pk: found[key] for key, post in keys.items()}
+
+
+def stitch(html: str, **slots) -> str:
+    for name, value in slots.items():
+        html = html.replace(f'<!--slot:{name}-->', value)
+    return mark_safe(html)
@@ -0,0 +1,91 @@
+import re
+from pathlib import Path
+
+from django.conf import settings
+from PIL import ExifTags, Image, ImageOps
+
+
+# -----------------------------
+#  RESPONSIVE IMAGE DERIVATIVES
+# -----------------------------
+# Every uploaded image gets one resized copy per BLOG_IMAGE_WIDTHS entry in
+# each of DERIVATIVE_FORMATS. Locally they are written next to the original
+# as `<public_id>_w<width>.<ext>`; on Cloudinary they are requested as eager
+# transformations, so both backends serve the same srcset shape.
+#
+# Originals are never enlarged. Widths at or above the original's are
+# replaced by a single copy at the original's own width, which uploads
+# record in the public id (`<id>_<width>w`), so srcsets can list only the
+# copies that exist, each at its real width. Images stored before that
+# carry no width and advertise every configured width.
+
+DERIVATIVE_FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+DERIVATIVE_QUALITY = 80
+_WIDTH_RE = re.compile(r'_(\d+)w$')
+
+
+def derivative_name(public_id: str, width: int, ext: str) -> str:
+    return f'{public_id}_w{width}.{ext}'
+
+
+def source_width(source) -> int:
+    """Width of ``source`` as displayed (after EXIF rotation), read from its header."""
+    with Image.open(source) as image:
+        orientation = image.getexif().get(ExifTags.Base.Orientation, 1)
+        return image.height if orientation in (5, 6, 7, 8) else image.width
+
+
+def with_width(public_id: str, width: int) -> str:
+    return f'{public_id}_{width}w'
+
+
+def original_width(public_id: str):
+    """The width recorded by ``with_width``, or None for older uploads."""
+    match = _WIDTH_RE.search(public_id)
+    return int(match.group(1)) if match else None
+
+
+def fitted_widths(widths, original) -> list:
+    """``widths`` below ``original``, plus ``original`` itself if any were cut."""
+    if original is None:
+        return list(widths)
+    kept = [width for width in widths if width < original]
+    return kept + [original] if len(kept) < len(widths) else kept
+
+
+def _flatten(image):
+    # JPEG has no alpha channel; composite transparent images onto white.
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def generate_derivatives(source, destination: Path, public_id: str) -> list:
+    """Write the resized copies of ``source`` under ``destination``."""
+    written = []
+    with Image.open(source) as original:
+        image = _flatten(ImageOps.exif_transpose(original))
+    for width in fitted_widths(settings.BLOG_IMAGE_WIDTHS, image.width):
+        resized = image.copy()
+        resized.thumbnail((width, image.height), Image.Resampling.LANCZOS)
+        for ext, pillow_format in DERIVATIVE_FORMATS.items():
+            path = destination / derivative_name(public_id, width, ext)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            resized.save(path, pillow_format, quality=DERIVATIVE_QUALITY, optimize=pillow_format == 'JPEG')
+            written.append(path)
+    return written
+
+
+def cloudinary_transformation(width: int, ext: str) -> dict:
+    return {'width': width, 'crop': 'limit', 'format': ext, 'quality': 'auto'}
+
+
+def eager_transformations(original: int) -> list:
+    return [
+        cloudinary_transformation(width, ext)
+        for width in fitted_widths(settings.BLOG_IMAGE_WIDTHS, original)
+        for ext in DERIVATIVE_FORMATS
+    ]
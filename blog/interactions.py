@@ -0,0 +1,166 @@
+import operator
+from collections import Counter, defaultdict
+from functools import reduce
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+
+from . import notifications, pagecache, trending
+from .models import InteractionIntent, Post
+
+
+# -----------------------------
+#  BUFFERED LIKE / SAVE TOGGLES
+# -----------------------------
+# A toggle request only appends an InteractionIntent row. It does not read
+# the post or the relation, and it does not update the post's counters.
+# `python manage.py flush_interactions` later takes the oldest intents in
+# one transaction:
+#
+# - Repeated toggles of the same (user, post, kind) cancel out in pairs.
+#   Only an odd count changes anything.
+# - It reads the current relation rows for what is left, in one query
+#   per kind.
+# - New rows go in with one INSERT ... ON CONFLICT DO NOTHING, and removed
+#   ones go out with one DELETE.
+# - It applies the net counter change per post. Posts with the same change
+#   share one UPDATE.
+#
+# A hot post therefore takes one counter update per flush instead of one
+# per click. Until a flush, readers see the old relation; the viewer's own
+# pending toggles are overlaid on their pages by annotate_viewer_state.
+#
+# Buffering is opt-in (BLOG_INTERACTIONS_BUFFERED). When it is off, the
+# default, each toggle is applied inside the request instead
+# (Post.toggle_like / toggle_save). When it is on, flush_interactions must
+# be running, and the pending flags below must live in a shared cache so
+# every web worker sees them.
+
+Kind = InteractionIntent.Kind
+RELATIONS = {Kind.LIKE: 'likes', Kind.SAVE: 'saved_by'}
+COUNTERS = {Kind.LIKE: 'like_count', Kind.SAVE: 'save_count'}
+
+PENDING_PREFIX = 'blog:intents:'
+PENDING_TTL = 5 * 60  # seconds a user is checked for unflushed toggles
+
+
+def toggle(user, post_id: int, kind: str) -> None:
+    """Record that ``user`` toggled ``kind`` on a post; 404 if it is gone."""
+    if not settings.BLOG_INTERACTIONS_BUFFERED:
+        post = get_object_or_404(Post, pk=post_id)
+        if kind == Kind.LIKE:
+            post.toggle_like(user)
+        else:
+            post.toggle_save(user)
+        return
+    try:
+        with transaction.atomic():
+            InteractionIntent.objects.create(user=user, post_id=post_id, kind=kind)
+    except IntegrityError:
+        raise Http404("No Post matches the given query.")
+    cache.set(f'{PENDING_PREFIX}{user.pk}', 1, PENDING_TTL)
+
+
+def pending_toggles(user, post_ids) -> dict:
+    """Post id -> kinds ``user`` has toggled an odd number of times, unflushed.
+
+    Free for users who have not toggled anything recently: they are skipped
+    on a cache flag, without a query.
+    """
+    if not settings.BLOG_INTERACTIONS_BUFFERED or not cache.get(f'{PENDING_PREFIX}{user.pk}'):
+        return {}
+    counts = Counter(
+        InteractionIntent.objects.filter(user=user, post_id__in=post_ids).values_list('post_id', 'kind')
+    )
+    flipped = defaultdict(set)
+    for (post_id, kind), count in counts.items():
+        if count % 2:
+            flipped[post_id].add(kind)
+    return flipped
+
+
+def _apply(kind, pairs, deltas) -> None:
+    """Flip the (post_id, user_id) ``pairs`` of ``kind``, noting counter deltas."""
+    through = getattr(Post, RELATIONS[kind]).through
+    present = set(
+        through.objects.filter(
+            post_id__in={post_id for post_id, _ in pairs},
+            user_id__in={user_id for _, user_id in pairs},
+        ).values_list('post_id', 'user_id')
+    ) & pairs
+    added = pairs - present
+    through.objects.bulk_create(
+        [through(post_id=post_id, user_id=user_id) for post_id, user_id in added],
+        ignore_conflicts=True,
+    )
+    if present:
+        by_post = defaultdict(list)
+        for post_id, user_id in present:
+            by_post[post_id].append(user_id)
+        through.objects.filter(reduce(operator.or_, (
+            Q(post_id=post_id, user_id__in=user_ids) for post_id, user_ids in by_post.items()
+        ))).delete()
+
+    if kind == Kind.LIKE and added:
+        notifications.likes_added(added)
+
+    counter = COUNTERS[kind]
+    for post_id, _ in added:
+        deltas[post_id][counter] += 1
+    for post_id, _ in present:
+        deltas[post_id][counter] -= 1
+
+
+def _update_counters(deltas) -> list:
+    """Apply per-post counter deltas; returns the ids of posts that changed."""
+    groups = defaultdict(list)
+    for post_id, change in deltas.items():
+        change = tuple(sorted((field, delta) for field, delta in change.items() if delta))
+        if change:
+            groups[change].append(post_id)
+    for change, post_ids in groups.items():
+        Post.objects.filter(pk__in=post_ids).update(
+            version=F('version') + 1, **{field: F(field) + delta for field, delta in change}
+        )
+    return [post_id for post_ids in groups.values() for post_id in post_ids]
+
+
+def flush(*, batch_size=None) -> int:
+    """Apply up to ``batch_size`` of the oldest toggles; returns how many were consumed."""
+    from accounts import stats
+
+    batch_size = batch_size or settings.BLOG_INTERACTIONS_BATCH_SIZE
+    with transaction.atomic():
+        # Concurrent flushers queue on the same oldest rows rather than
+        # applying overlapping batches.
+        intents = list(
+            InteractionIntent.objects.select_for_update().order_by('pk')
+            .values_list('pk', 'user_id', 'post_id', 'kind')[:batch_size]
+        )
+        if not intents:
+            return 0
+        parity = Counter((kind, post_id, user_id) for _, user_id, post_id, kind in intents)
+        deltas = defaultdict(Counter)
+        for kind in RELATIONS:
+            pairs = {(post_id, user_id) for (k, post_id, user_id), count in parity.items() if k == kind and count % 2}
+            if pairs:
+                _apply(kind, pairs, deltas)
+        InteractionIntent.objects.filter(pk__in=[pk for pk, *_ in intents]).delete()
+
+        changed = _update_counters(deltas)
+        posts = list(
+            Post.objects.filter(pk__in=changed)
+            .only('id', 'author_id', 'publish', 'like_count', 'save_count', 'comment_count')
+        )
+        likes_by_author = Counter()
+        for post in posts:
+            likes_by_author[post.author_id] += deltas[post.pk]['like_count']
+        for author_id, delta in likes_by_author.items():
+            stats.bump(author_id, likes_received=delta)
+        trending.refresh_posts(posts)
+        pagecache.invalidate(*[pagecache.post_tag(post_id) for post_id in changed])
+    return len(intents)
@@ -0,0 +1,79 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from .bench_views import _targets
+
+
+class Command(BaseCommand):
+    help = (
+        "Request the home feed repeatedly through the test client against the "
+        "configured database, releasing connections after every request the "
+        "way a new worker thread or CONN_MAX_AGE=0 does. Run it with and "
+        "without DATABASE_POOL=True to see connection setup leave the tail "
+        "latency (see docs/pooling.md)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, dest='total')
+        parser.add_argument(
+            '--keep', action='store_true',
+            help="Keep connections between requests (the persistent-connection baseline).",
+        )
+        parser.add_argument('--label', default='', help="Tag printed with the result row.")
+
+    def handle(self, *args, total, keep, label, **options):
+        pool = getattr(connection, 'pool', None)
+        opened = 0
+
+        def count_connect(sender, connection, **kwargs):
+            nonlocal opened
+            opened += 1
+
+        setup_test_environment()
+        connection_created.connect(count_connect)
+        try:
+            viewer, views = _targets()
+            client = Client()
+            client.force_login(get_user_model().objects.get(pk=viewer))
+            path = views['post_list']
+            if client.get(path).status_code != 200:
+                raise CommandError(f"{path} did not return 200.")
+            if pool is not None:
+                pool.pop_stats()
+            opened = 0
+
+            timings = []
+            for _ in range(total):
+                if not keep:
+                    # A pooled connection goes back to the pool; any other is closed.
+                    connections.close_all()
+                started = time.perf_counter()
+                client.get(path)
+                timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            connection_created.disconnect(count_connect)
+            teardown_test_environment()
+
+        # With a pool, connection_created fires on every checkout; count the
+        # server connections the pool actually opened instead.
+        connects = pool.pop_stats().get('connections_num', 0) if pool is not None else opened
+        quantiles = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+        mode = 'pool' if pool is not None else ('persistent' if keep else 'per-request')
+        self.stdout.write(
+            f"{'label':<8} {'mode':<12} {'vendor':<10} {'requests':>8} {'connects':>8} "
+            f"{'p50ms':>8} {'p95ms':>8} {'p99ms':>8}"
+        )
+        self.stdout.write(
+            f"{label:<8} {mode:<12} {connection.vendor:<10} {total:>8} {connects:>8} "
+            f"{quantiles[49]:>8.1f} {quantiles[94]:>8.1f} {quantiles[98]:>8.1f}"
+        )
+        if settings.DATABASE_POOL and pool is None:
+            self.stdout.write(self.style.WARNING("DATABASE_POOL is set but only PostgreSQL is pooled."))
@@ -0,0 +1,56 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Load a running server with concurrent GETs and report latency "
+        "percentiles and throughput. Run it once against the WSGI server and "
+        "once against the ASGI server to compare them (see docs/asgi.md)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_url', help="e.g. http://127.0.0.1:8000")
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help="Path to request; repeatable. Defaults to the home feed.",
+        )
+        parser.add_argument('--requests', type=int, default=200, dest='total', help="Requests per path.")
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--label', default='', help="Tag printed with each result row.")
+
+    def handle(self, *args, base_url, paths, total, concurrency, label, **options):
+        local = threading.local()
+
+        def fetch(url):
+            session = getattr(local, 'session', None)
+            if session is None:
+                session = local.session = requests.Session()
+            started = time.perf_counter()
+            try:
+                ok = session.get(url, timeout=30).status_code < 400
+            except OSError:
+                ok = False
+            return time.perf_counter() - started, ok
+
+        self.stdout.write(f"{'label':<8} {'path':<32} {'ok':>5} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8} {'req/s':>8}")
+        for path in paths or ['/']:
+            url = base_url.rstrip('/') + path
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                fetch(url)  # warm up connections and caches
+                started = time.perf_counter()
+                results = list(pool.map(fetch, [url] * total))
+                elapsed = time.perf_counter() - started
+
+            timings = sorted(duration * 1000 for duration, _ in results)
+            quantiles = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+            self.stdout.write(
+                f"{label:<8} {path:<32} {sum(ok for _, ok in results):>5} "
+                f"{quantiles[49]:>8.1f} {quantiles[94]:>8.1f} {quantiles[98]:>8.1f} "
+                f"{len(results) / elapsed:>8.1f}"
+            )
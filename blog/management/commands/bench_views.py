@@ -0,0 +1,147 @@
+import json
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, setup_databases, setup_test_environment, teardown_databases,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Profile
+from blog import trending
+from blog.models import Post, Story
+from blog.seed import seed_dataset
+
+BUDGETS_FILE = Path(__file__).resolve().parents[2] / 'query_budgets.json'
+
+
+def _targets():
+    """Pick a busy viewer, post, profile and story author from the dataset."""
+    viewer = Profile.objects.annotate(n=Count('user__following')).order_by('-n').values_list('user_id', flat=True)[0]
+    post = Post.objects.order_by('-comment_count', '-like_count').first()
+    author = Profile.objects.annotate(n=Count('followers')).order_by('-n').select_related('user').first().user
+    story = (
+        Story.objects.filter(expires_at__gt=timezone.now(), author__profile__followers=viewer)
+        .select_related('author').first()
+        or Story.objects.select_related('author').first()
+    )
+    views = {
+        'post_list': reverse('post_list'),
+        'trending_feed': reverse('trending_feed'),
+        'post_detail': reverse('post_detail', kwargs={'pk': post.pk}),
+        'profile_view': reverse('profile'),
+        'public_profile_view': reverse('public_profile', kwargs={'username': author.username}),
+    }
+    if story:
+        views['story_view'] = reverse('story_view', kwargs={'username': story.author.username})
+    return viewer, views
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed throwaway test databases of increasing size and measure query "
+        "count, latency and peak memory of the main views through the test "
+        "client. Fails when a view exceeds its budget in blog/query_budgets.json."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='100,1000',
+            help="Comma-separated user counts; each dataset grows the previous one.",
+        )
+        parser.add_argument('--repeat', type=int, default=10, help="Warm requests timed per view.")
+        parser.add_argument('--seed', type=int, default=0, dest='rng_seed')
+        parser.add_argument(
+            '--update-budgets', action='store_true',
+            help="Write the highest cold query counts seen as the new budgets.",
+        )
+
+    def handle(self, *args, sizes, repeat, rng_seed, update_budgets, **options):
+        sizes = sorted(int(size) for size in sizes.split(','))
+        budgets = json.loads(BUDGETS_FILE.read_text()) if BUDGETS_FILE.exists() else {}
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        try:
+            results = self._run(sizes, repeat, rng_seed)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        worst = {}
+        for row in results:
+            worst[row['view']] = max(worst.get(row['view'], 0), row['cold_queries'])
+        if update_budgets:
+            BUDGETS_FILE.write_text(json.dumps(dict(sorted(worst.items())), indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Budgets written to {BUDGETS_FILE}."))
+            return
+
+        over = [
+            f"{row['view']} at {row['users']} users: {row['cold_queries']} queries > {budgets[row['view']]}"
+            for row in results
+            if row['view'] in budgets and row['cold_queries'] > budgets[row['view']]
+        ]
+        if over:
+            raise CommandError("Query budget exceeded:\n  " + "\n  ".join(over))
+        self.stdout.write(self.style.SUCCESS("All views within their query budgets."))
+
+    def _run(self, sizes, repeat, rng_seed):
+        self.stdout.write(
+            f"{'users':>7} {'view':<20} {'cold q':>6} {'warm q':>6} {'cold ms':>8} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'peak KiB':>9}"
+        )
+        results = []
+        seeded = 0
+        for size in sizes:
+            seed_dataset(users=size - seeded, rng_seed=rng_seed + size)
+            seeded = size
+            trending.rebuild()
+            viewer, views = _targets()
+            client = Client()
+            client.force_login(Profile.objects.get(user_id=viewer).user)
+
+            for name, path in views.items():
+                # The query log is a bounded deque; a full one counts nothing.
+                reset_queries()
+                cache.clear()
+                with CaptureQueriesContext(connection) as cold:
+                    started = time.perf_counter()
+                    response = client.get(path)
+                    cold_ms = (time.perf_counter() - started) * 1000
+                if response.status_code != 200:
+                    raise CommandError(f"{name} ({path}) returned {response.status_code}.")
+
+                cache.clear()
+                tracemalloc.start()
+                client.get(path)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+                timings = []
+                reset_queries()
+                with CaptureQueriesContext(connection) as warm:
+                    for _ in range(repeat):
+                        started = time.perf_counter()
+                        client.get(path)
+                        timings.append((time.perf_counter() - started) * 1000)
+                quantiles = statistics.quantiles(timings, n=20) if len(timings) > 1 else timings * 19
+
+                row = {
+                    'users': size, 'view': name, 'cold_queries': len(cold),
+                    'warm_queries': len(warm) // max(repeat, 1),
+                }
+                results.append(row)
+                self.stdout.write(
+                    f"{size:>7} {name:<20} {row['cold_queries']:>6} {row['warm_queries']:>6} {cold_ms:>8.1f} "
+                    f"{statistics.median(timings):>8.1f} {quantiles[18]:>8.1f} {peak / 1024:>9.0f}"
+                )
+        return results
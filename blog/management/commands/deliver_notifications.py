@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from blog import notifications
+from blog.checks import cache_is_shared
+
+
+class Command(BaseCommand):
+    help = "Fold queued like, comment and follow events into notifications (see blog/notifications.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help="Events per transaction.")
+        parser.add_argument('--poll', type=float, default=1.0, help="Seconds between queue checks when idle.")
+        parser.add_argument('--once', action='store_true', help="Drain the queue once and exit.")
+
+    def handle(self, *args, batch_size, poll, once, **options):
+        if not cache_is_shared():
+            self.stdout.write(self.style.WARNING(
+                "The default cache is local to this process, so web workers will not see "
+                "the page-cache invalidations made here; set CACHE_URL (see docs/caching.md)."
+            ))
+        while True:
+            close_old_connections()
+            started = time.perf_counter()
+            delivered = total = notifications.deliver(batch_size=batch_size)
+            while delivered and once:
+                delivered = notifications.deliver(batch_size=batch_size)
+                total += delivered
+            if total:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Delivered {total} event(s) in {time.perf_counter() - started:.2f}s."
+                ))
+            if once:
+                break
+            if not total:
+                time.sleep(poll)
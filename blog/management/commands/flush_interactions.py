@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from blog import interactions
+from blog.checks import cache_is_shared
+
+
+class Command(BaseCommand):
+    help = "Apply buffered like/save toggles in batches (see blog/interactions.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help="Toggles per transaction.")
+        parser.add_argument('--poll', type=float, default=0.5, help="Seconds between buffer checks when idle.")
+        parser.add_argument('--once', action='store_true', help="Drain the buffer once and exit.")
+
+    def handle(self, *args, batch_size, poll, once, **options):
+        if not cache_is_shared():
+            self.stdout.write(self.style.WARNING(
+                "The default cache is local to this process, so web workers will not see "
+                "the page-cache invalidations made here; set CACHE_URL (see docs/caching.md)."
+            ))
+        while True:
+            close_old_connections()
+            started = time.perf_counter()
+            applied = total = interactions.flush(batch_size=batch_size)
+            while applied and once:
+                applied = interactions.flush(batch_size=batch_size)
+                total += applied
+            if total:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Flushed {total} toggle(s) in {time.perf_counter() - started:.2f}s."
+                ))
+            if once:
+                break
+            if not total:
+                time.sleep(poll)
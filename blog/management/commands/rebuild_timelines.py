@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import timeline
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfill the materialized Following timelines from the current "
+        "follow graph: every author's most recent posts are copied into "
+        "their own and their followers' timelines. Safe to re-run; rows "
+        "that already exist are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help="Timelines per INSERT.")
+
+    def handle(self, *args, batch_size, **options):
+        started = time.perf_counter()
+        offered = timeline.rebuild(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfilled {offered} timeline entr{'y' if offered == 1 else 'ies'} "
+            f"in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the trending score of every post in the trending window "
+        "and replace the ranked table behind /trending/. Meant to run every "
+        "few minutes (cron); likes, saves and comments rescore single posts "
+        "in between."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, batch_size, **options):
+        started = time.perf_counter()
+        written = trending.rebuild(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f"Ranked {written} post(s) in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from blog.models import Comment, Post
+
+
+def _count_for_post(queryset):
+    """Correlated ``COUNT(*)`` of ``queryset`` rows per outer post."""
+    counts = (
+        queryset.filter(post=OuterRef('pk'))
+        .order_by()
+        .values('post')
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+def true_counts():
+    return {
+        'like_count': _count_for_post(Post.likes.through.objects.all()),
+        'save_count': _count_for_post(Post.saved_by.through.objects.all()),
+        'comment_count': _count_for_post(Comment.objects.filter(active=True)),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute Post.like_count, save_count and comment_count from the "
+        "underlying tables and fix any rows that have drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Report drifted rows without writing.",
+        )
+
+    def handle(self, *args, batch_size, dry_run, **options):
+        counts = true_counts()
+        drift = Q()
+        for field in counts:
+            drift |= ~Q(**{field: F(f'true_{field}')})
+
+        last_id = 0
+        fixed = 0
+        while True:
+            batch = list(
+                Post.objects.filter(pk__gt=last_id)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1]
+            drifted = list(
+                Post.objects.filter(pk__in=batch)
+                .annotate(**{f'true_{field}': expr for field, expr in counts.items()})
+                .filter(drift)
+                .values_list('pk', flat=True)
+            )
+            if drifted and not dry_run:
+                Post.objects.filter(pk__in=drifted).update(**counts)
+            fixed += len(drifted)
+
+        verb = "would be fixed" if dry_run else "fixed"
+        self.stdout.write(self.style.SUCCESS(f"{fixed} post(s) with drifted counters {verb}."))
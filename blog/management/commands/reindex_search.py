@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+
+from blog import search
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the full-text search index (PostgreSQL tsvector or SQLite "
+        "FTS5) for every post, in id-range batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, batch_size, **options):
+        kind = search.backend()
+        if kind == 'fallback':
+            self.stdout.write("No full-text index on this database; nothing to do.")
+            return
+
+        bounds = Post.objects.aggregate(first=Min('pk'), last=Max('pk'))
+        if bounds['first'] is None:
+            self.stdout.write("No posts to index.")
+            return
+
+        for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+            search.reindex_range(start, start + batch_size - 1)
+        self.stdout.write(self.style.SUCCESS(
+            f"Reindexed posts {bounds['first']}..{bounds['last']} ({kind})."
+        ))
@@ -0,0 +1,42 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from blog import media
+from blog.checks import cache_is_shared
+
+
+class Command(BaseCommand):
+    help = "Upload spooled post, story and avatar media in the background, with retries."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Concurrent uploads.")
+        parser.add_argument('--poll', type=float, default=1.0, help="Seconds between queue checks when idle.")
+        parser.add_argument('--once', action='store_true', help="Drain the due jobs once and exit.")
+
+    def handle(self, *args, workers, poll, once, **options):
+        if not cache_is_shared():
+            self.stdout.write(self.style.WARNING(
+                "The default cache is local to this process, so web workers will not see "
+                "the page-cache invalidations made here; set CACHE_URL (see docs/caching.md)."
+            ))
+        def run(job_id):
+            close_old_connections()
+            try:
+                return media.process_job(job_id)
+            finally:
+                close_old_connections()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                close_old_connections()
+                job_ids = media.due_job_ids(limit=workers * 4)
+                if job_ids:
+                    done = sum(pool.map(run, job_ids))
+                    self.stdout.write(f"Uploaded {done}/{len(job_ids)} job(s).")
+                if once:
+                    break
+                if not job_ids:
+                    time.sleep(poll)
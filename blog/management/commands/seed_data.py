@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.seed import SEED_PASSWORD, seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-create a synthetic dataset (users, follows, posts, tags, likes, "
+        "saves, comments, stories) for local profiling and benchmarks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts-per-user', type=float, default=10)
+        parser.add_argument('--follows-per-user', type=float, default=20)
+        parser.add_argument('--likes-per-post', type=float, default=8)
+        parser.add_argument('--saves-per-post', type=float, default=2)
+        parser.add_argument('--comments-per-post', type=float, default=3)
+        parser.add_argument('--tags', type=int, default=50, help="Distinct tags to draw from.")
+        parser.add_argument('--tags-per-post', type=int, default=3)
+        parser.add_argument('--story-ratio', type=float, default=0.3, help="Share of users with a live story.")
+        parser.add_argument('--prefix', default='seed', help="Username prefix.")
+        parser.add_argument('--seed', type=int, default=0, dest='rng_seed', help="Random seed.")
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        created = seed_dataset(
+            users=options['users'],
+            posts_per_user=options['posts_per_user'],
+            follows_per_user=options['follows_per_user'],
+            likes_per_post=options['likes_per_post'],
+            saves_per_post=options['saves_per_post'],
+            comments_per_post=options['comments_per_post'],
+            tags=options['tags'],
+            tags_per_post=options['tags_per_post'],
+            story_ratio=options['story_ratio'],
+            prefix=options['prefix'],
+            rng_seed=options['rng_seed'],
+            batch_size=options['batch_size'],
+        )
+        for kind, count in created.items():
+            self.stdout.write(f"{kind:>18}: {count}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded in {time.perf_counter() - started:.1f}s. "
+            f"Seeded users log in with password '{SEED_PASSWORD}'."
+        ))
@@ -0,0 +1,258 @@
+import logging
+import shutil
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from cloudinary import uploader as cloudinary_uploader
+from django.apps import apps
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import images, pagecache
+from .models import MediaStatus, MediaUploadJob
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------------
+#  BACKGROUND MEDIA UPLOADS
+# -----------------------------
+# Views call `spool_uploads` before saving a model with a CloudinaryField,
+# so the request only writes the file to local disk. `enqueue` records a
+# MediaUploadJob per file. `python manage.py run_media_worker` (or the
+# in-process BLOG_MEDIA_EAGER mode) uploads it, retrying with backoff, and
+# swaps the stored value in once done. Images also get the responsive
+# derivatives described in blog/images.py at that point.
+#
+# A newer upload to the same field drops any older job still pending, and
+# an older job that was already running discards its result, so the last
+# upload always wins. Spool files go as soon as a job is done or given up.
+
+
+class CloudinaryUploader:
+    def upload(self, path, *, resource_type, options) -> str:
+        if resource_type == 'image':
+            width = images.source_width(path)
+            options = {
+                **options,
+                'public_id': images.with_width(uuid.uuid4().hex, width),
+                'eager': images.eager_transformations(width),
+                'eager_async': True,
+            }
+        resource = cloudinary_uploader.upload_resource(str(path), resource_type=resource_type, **options)
+        return resource.get_prep_value()
+
+    def image_sources(self, resource, widths) -> dict:
+        """``src`` plus a srcset per derivative format, as transformation URLs."""
+        widths = images.fitted_widths(widths, images.original_width(resource.public_id))
+        sources = {
+            ext: ', '.join(
+                f'{resource.build_url(**images.cloudinary_transformation(width, ext))} {width}w' for width in widths
+            )
+            for ext in images.DERIVATIVE_FORMATS
+        }
+        sources['src'] = resource.build_url(**images.cloudinary_transformation(widths[-1], 'jpg'))
+        return sources
+
+
+class LocalUploader:
+    """Offline stand-in: copies the file under MEDIA_ROOT/<folder>/."""
+
+    def upload(self, path, *, resource_type, options) -> str:
+        path = Path(path)
+        folder = options.get('folder', '')
+        public_id = '/'.join(filter(None, [folder, uuid.uuid4().hex]))
+        if resource_type == 'image':
+            public_id = images.with_width(public_id, images.source_width(path))
+        destination = Path(settings.MEDIA_ROOT) / f'{public_id}{path.suffix}'
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(path, destination)
+        if resource_type == 'image':
+            images.generate_derivatives(path, Path(settings.MEDIA_ROOT), public_id)
+        return f'{resource_type}/upload/{public_id}{path.suffix}'
+
+    def image_sources(self, resource, widths) -> dict:
+        root = Path(settings.MEDIA_ROOT)
+        widths = images.fitted_widths(widths, images.original_width(resource.public_id))
+        if not (root / images.derivative_name(resource.public_id, widths[0], 'jpg')).exists():
+            original = f'{resource.public_id}.{resource.format}' if resource.format else resource.public_id
+            if (root / original).exists():
+                return {'src': settings.MEDIA_URL + original}
+            # Stored before the local backend was enabled; still on Cloudinary.
+            return CloudinaryUploader().image_sources(resource, widths)
+
+        def url(width, ext):
+            return settings.MEDIA_URL + images.derivative_name(resource.public_id, width, ext)
+
+        sources = {
+            ext: ', '.join(f'{url(width, ext)} {width}w' for width in widths)
+            for ext in images.DERIVATIVE_FORMATS
+        }
+        sources['src'] = url(widths[-1], 'jpg')
+        return sources
+
+
+def get_uploader():
+    return import_string(settings.BLOG_MEDIA_UPLOADER)()
+
+
+# --- Request side ---
+def spool_uploads(instance, fields) -> dict:
+    """Move pending uploads on ``instance`` to the spool directory.
+
+    Each field holding an ``UploadedFile`` gets its previous stored value
+    back (or empty for new rows) so saving does not upload inline, and the
+    instance is marked as processing. Returns ``{field: spool_path}``.
+    """
+    spool_dir = Path(settings.BLOG_MEDIA_SPOOL_DIR)
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    previous = {}
+    if instance.pk:
+        previous = type(instance).objects.filter(pk=instance.pk).values(*fields).first() or {}
+
+    spooled = {}
+    for field in fields:
+        upload = getattr(instance, field)
+        if not isinstance(upload, UploadedFile):
+            continue
+        path = spool_dir / f'{uuid.uuid4().hex}{Path(upload.name).suffix.lower()}'
+        with path.open('wb') as spool_file:
+            for chunk in upload.chunks():
+                spool_file.write(chunk)
+        spooled[field] = str(path)
+        setattr(instance, field, previous.get(field))
+    if spooled and hasattr(instance, 'media_status'):
+        instance.media_status = MediaStatus.PROCESSING
+    return spooled
+
+
+def _discard_spool(paths) -> None:
+    for path in paths:
+        Path(path).unlink(missing_ok=True)
+
+
+def enqueue(instance, spooled) -> None:
+    """Queue an upload job per spooled file once the transaction commits.
+
+    Pending jobs for the same fields are dropped: only the newest upload
+    should end up on the row.
+    """
+    if not spooled:
+        return
+    superseded = MediaUploadJob.objects.filter(
+        target=instance._meta.label, object_id=instance.pk, field__in=list(spooled),
+        status=MediaUploadJob.Status.PENDING,
+    )
+    stale_paths = list(superseded.values_list('spool_path', flat=True))
+    if stale_paths:
+        superseded.delete()
+        transaction.on_commit(lambda: _discard_spool(stale_paths))
+    jobs = MediaUploadJob.objects.bulk_create([
+        MediaUploadJob(
+            target=instance._meta.label,
+            object_id=instance.pk,
+            field=field,
+            spool_path=path,
+        )
+        for field, path in spooled.items()
+    ])
+    if settings.BLOG_MEDIA_EAGER:
+        job_ids = [job.pk for job in jobs]
+        transaction.on_commit(lambda: [process_job(job_id) for job_id in job_ids])
+
+
+# --- Worker side ---
+def due_job_ids(limit: int) -> list:
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.BLOG_MEDIA_JOB_TIMEOUT)
+    return list(
+        MediaUploadJob.objects.filter(
+            Q(status=MediaUploadJob.Status.PENDING, next_attempt_at__lte=now)
+            | Q(status=MediaUploadJob.Status.RUNNING, locked_at__lt=stale)
+        )
+        .order_by('next_attempt_at')
+        .values_list('pk', flat=True)[:limit]
+    )
+
+
+def _claim(job_id: int):
+    """Atomically take ownership of a job; None if another worker has it."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.BLOG_MEDIA_JOB_TIMEOUT)
+    claimed = MediaUploadJob.objects.filter(
+        Q(status=MediaUploadJob.Status.PENDING) | Q(status=MediaUploadJob.Status.RUNNING, locked_at__lt=stale),
+        pk=job_id,
+    ).update(status=MediaUploadJob.Status.RUNNING, locked_at=now)
+    return MediaUploadJob.objects.get(pk=job_id) if claimed else None
+
+
+def _finish_target(job, status, **values):
+    model = apps.get_model(job.target)
+    field_names = {field.name for field in model._meta.get_fields()}
+    outstanding = MediaUploadJob.objects.filter(
+        target=job.target, object_id=job.object_id,
+        status__in=[MediaUploadJob.Status.PENDING, MediaUploadJob.Status.RUNNING],
+    ).exclude(pk=job.pk)
+    if 'media_status' in field_names and (status == MediaStatus.FAILED or not outstanding.exists()):
+        values['media_status'] = status
+    if 'version' in field_names:
+        # Invalidate cached fragments rendered without the media.
+        values['version'] = F('version') + 1
+    model.objects.filter(pk=job.object_id).update(**values)
+    target = model.objects.filter(pk=job.object_id).first()
+    if target is not None:
+        pagecache.invalidate(*pagecache.tags_for(target))
+
+
+def _superseded(job) -> bool:
+    """Whether a newer upload for the same field of the same row was queued."""
+    return MediaUploadJob.objects.filter(
+        target=job.target, object_id=job.object_id, field=job.field, pk__gt=job.pk,
+    ).exists()
+
+
+def process_job(job_id: int) -> bool:
+    """Upload one job's file; returns True once it is done."""
+    job = _claim(job_id)
+    if job is None:
+        return False
+
+    model = apps.get_model(job.target)
+    field = model._meta.get_field(job.field)
+    try:
+        value = get_uploader().upload(
+            job.spool_path, resource_type=field.resource_type, options={'type': field.type, **field.options}
+        )
+    except Exception as exc:
+        job.attempts += 1
+        job.last_error = repr(exc)
+        job.locked_at = None
+        if job.attempts >= settings.BLOG_MEDIA_MAX_ATTEMPTS:
+            job.status = MediaUploadJob.Status.FAILED
+            if not _superseded(job):
+                _finish_target(job, MediaStatus.FAILED)
+            _discard_spool([job.spool_path])
+            logger.error("Media upload %s failed permanently: %s", job, exc)
+        else:
+            job.status = MediaUploadJob.Status.PENDING
+            delay = settings.BLOG_MEDIA_RETRY_DELAY * 2 ** (job.attempts - 1)
+            job.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+            logger.warning("Media upload %s failed, retrying in %ss: %s", job, delay, exc)
+        job.save()
+        return False
+
+    job.status = MediaUploadJob.Status.DONE
+    job.attempts += 1
+    job.save()
+    if _superseded(job):
+        # A newer upload for this field was queued while this one ran.
+        logger.info("Media upload %s superseded; result discarded.", job)
+    else:
+        _finish_target(job, MediaStatus.READY, **{job.field: value})
+    _discard_spool([job.spool_path])
+    return True
@@ -0,0 +1,246 @@
+import os
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates
+from django.utils.crypto import constant_time_compare
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+
+# -----------------------------
+#  PROMETHEUS METRICS
+# -----------------------------
+# Request metrics are labelled by URL name (`post_detail`, `admin:index`),
+# never by raw path, so the label set stays bounded. Under gunicorn set
+# PROMETHEUS_MULTIPROC_DIR so every worker writes to a shared directory that
+# `/metrics` aggregates (see gunicorn.conf.py and docs/metrics.md).
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+REQUEST_LATENCY = Histogram(
+    'blog_request_latency_seconds', "Time spent producing a response.",
+    ['view', 'method'], buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter('blog_requests_total', "Responses sent.", ['view', 'method', 'status'])
+DB_QUERIES = Histogram(
+    'blog_db_queries_per_request', "Database queries issued per request.",
+    ['view'], buckets=QUERY_BUCKETS,
+)
+DB_TIME = Histogram(
+    'blog_db_time_seconds_per_request', "Database time per request.",
+    ['view'], buckets=LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    'blog_response_size_bytes', "Response body size (0 for streaming responses).",
+    ['view'], buckets=SIZE_BUCKETS,
+)
+TEMPLATE_RENDER = Histogram(
+    'blog_template_render_seconds', "Time spent rendering one template.",
+    ['template'], buckets=LATENCY_BUCKETS,
+)
+CACHE_LOOKUPS = Counter('blog_cache_lookups_total', "Cache lookups by outcome.", ['cache', 'result'])
+
+# Connection pool (DATABASE_POOL=True). Gauges are per worker process and
+# summed across live workers; counters accumulate psycopg_pool's stats.
+DB_POOL_CONNECTIONS = Gauge(
+    'blog_db_pool_connections', "Pooled connections by state (open, idle).",
+    ['alias', 'state'], multiprocess_mode='livesum',
+)
+DB_POOL_WAITING = Gauge(
+    'blog_db_pool_waiting', "Requests waiting for a pooled connection.",
+    ['alias'], multiprocess_mode='livesum',
+)
+DB_POOL_REQUESTS = Counter(
+    'blog_db_pool_requests_total', "Connection requests to the pool by outcome.", ['alias', 'result'],
+)
+DB_POOL_WAIT = Counter('blog_db_pool_wait_seconds_total', "Time spent waiting for a pooled connection.", ['alias'])
+DB_POOL_CONNECTS = Counter(
+    'blog_db_pool_connects_total', "Server connections opened by the pool by outcome.", ['alias', 'result'],
+)
+DB_POOL_CONNECT_TIME = Counter('blog_db_pool_connect_seconds_total', "Time spent opening server connections.", ['alias'])
+DB_POOL_LOST = Counter(
+    'blog_db_pool_lost_total', "Pooled connections that failed the health check and were replaced.", ['alias'],
+)
+
+
+def record_cache(name: str, hits: int, misses: int) -> None:
+    if hits:
+        CACHE_LOOKUPS.labels(name, 'hit').inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(name, 'miss').inc(misses)
+
+
+def record_pool_stats() -> None:
+    """Move each connection pool's stats into the pool metrics."""
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is None:
+            continue
+        stats = pool.pop_stats()
+        DB_POOL_CONNECTIONS.labels(alias, 'open').set(stats.get('pool_size', 0))
+        DB_POOL_CONNECTIONS.labels(alias, 'idle').set(stats.get('pool_available', 0))
+        DB_POOL_WAITING.labels(alias).set(stats.get('requests_waiting', 0))
+        timeouts = stats.get('requests_errors', 0)
+        queued = stats.get('requests_queued', 0)
+        DB_POOL_REQUESTS.labels(alias, 'immediate').inc(stats.get('requests_num', 0) - queued)
+        DB_POOL_REQUESTS.labels(alias, 'queued').inc(queued - timeouts)
+        DB_POOL_REQUESTS.labels(alias, 'timeout').inc(timeouts)
+        DB_POOL_WAIT.labels(alias).inc(stats.get('requests_wait_ms', 0) / 1000)
+        failed = stats.get('connections_errors', 0)
+        DB_POOL_CONNECTS.labels(alias, 'ok').inc(stats.get('connections_num', 0) - failed)
+        DB_POOL_CONNECTS.labels(alias, 'error').inc(failed)
+        DB_POOL_LOST.labels(alias).inc(stats.get('connections_lost', 0))
+        DB_POOL_CONNECT_TIME.labels(alias).inc(stats.get('connections_ms', 0) / 1000)
+
+
+# --- Middleware ---
+class _QueryRecorder:
+    """``execute_wrapper`` hook summing query count and time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        # Worker threads of blog.aio.concurrently record into it at once.
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self.lock:
+                self.count += 1
+                self.seconds += time.perf_counter() - started
+
+
+_recorder = ContextVar('blog_query_recorder', default=None)
+
+
+def _wrap_connections(recorder) -> ExitStack:
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(recorder))
+    return stack
+
+
+def record_queries() -> ExitStack:
+    """Count this thread's queries toward the request being observed, if any.
+
+    For code running on threads the middleware never sees; sync_to_async
+    carries the request's context, and with it the recorder, into them.
+    """
+    recorder = _recorder.get()
+    return _wrap_connections(recorder) if recorder else ExitStack()
+
+
+class MetricsMiddleware:
+    """Observe latency, DB usage and response size for every request.
+
+    Queries are counted on the connections of the thread running the
+    middleware, and on the worker threads of ``blog.aio.concurrently``
+    through ``record_queries``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        recorder = _QueryRecorder()
+        token = _recorder.set(recorder)
+        try:
+            with _wrap_connections(recorder):
+                response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        self._observe(request, response, time.perf_counter() - started, recorder)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        recorder = _QueryRecorder()
+        # Sync views and the async ORM run on the request's thread-sensitive
+        # worker thread, whose connections are not the event loop's.
+        stack = await sync_to_async(_wrap_connections)(recorder)
+        token = _recorder.set(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+            await sync_to_async(stack.close)()
+        self._observe(request, response, time.perf_counter() - started, recorder)
+        return response
+
+    def _observe(self, request, response, elapsed, recorder):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else '<unresolved>'
+        if view == 'metrics':
+            return
+        REQUEST_LATENCY.labels(view, request.method).observe(elapsed)
+        REQUESTS.labels(view, request.method, str(response.status_code)).inc()
+        DB_QUERIES.labels(view).observe(recorder.count)
+        DB_TIME.labels(view).observe(recorder.seconds)
+        size = 0 if response.streaming else len(response.content)
+        RESPONSE_SIZE.labels(view).observe(size)
+        if settings.DATABASE_POOL:
+            record_pool_stats()
+
+
+# --- Template timing ---
+class _TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            TEMPLATE_RENDER.labels(self.template.origin.template_name or '<string>').observe(
+                time.perf_counter() - started
+            )
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The stock Django template backend, timing each top-level render."""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+# --- Exposition ---
+def metrics_view(request):
+    token = settings.BLOG_METRICS_TOKEN
+    if not token:
+        # Without a token the endpoint only exists for local development.
+        if not settings.DEBUG:
+            raise Http404
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    registry = REGISTRY
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_post_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='story',
+            index=models.Index(fields=['author', 'expires_at', 'created_at'], name='blog_story_tray_idx'),
+        ),
+    ]
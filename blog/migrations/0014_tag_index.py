@@ -0,0 +1,71 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_tag_index(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    Post = apps.get_model('blog', 'Post')
+    TagPost = apps.get_model('blog', 'TagPost')
+    TagCount = apps.get_model('blog', 'TagCount')
+
+    content_type = ContentType.objects.filter(app_label='blog', model='post').first()
+    if content_type is None:
+        return
+    tagged = TaggedItem.objects.filter(content_type=content_type)
+    publish = dict(Post.objects.values_list('id', 'publish'))
+    TagPost.objects.bulk_create(
+        [
+            TagPost(tag_id=tag_id, post_id=post_id, publish=publish[post_id])
+            for tag_id, post_id in tagged.values_list('tag_id', 'object_id').iterator()
+            if post_id in publish
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    TagCount.objects.bulk_create(
+        [
+            TagCount(tag_id=row['tag_id'], post_count=row['total'])
+            for row in TagPost.objects.values('tag_id').annotate(total=Count('*'))
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_post_search_index'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagCount',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='taggit.tag')),
+                ('post_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-post_count'], name='blog_tagcount_popular_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TagPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('publish', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.post')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='taggit.tag')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tag', '-publish', '-post'], name='blog_tagpost_feed_idx'), models.Index(fields=['post'], name='blog_tagpost_post_idx')],
+                'constraints': [models.UniqueConstraint(fields=('tag', 'post'), name='blog_tagpost_tag_post_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_tag_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0016_post_author_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingPost',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='blog.post')),
+                ('score', models.FloatField()),
+                ('publish', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-score', '-post'], name='blog_trending_rank_idx')],
+            },
+        ),
+    ]
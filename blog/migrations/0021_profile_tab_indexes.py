@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0020_notifications'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['user', '-created', '-id'], name='blog_comment_user_idx'),
+        ),
+        # The auto-created like/save through tables can't declare Meta.indexes;
+        # these back the liked and saved profile tabs (user, newest first).
+        migrations.RunSQL(
+            'CREATE INDEX blog_post_likes_user_idx ON blog_post_likes (user_id, id)',
+            reverse_sql='DROP INDEX blog_post_likes_user_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX blog_post_saved_by_user_idx ON blog_post_saved_by (user_id, id)',
+            reverse_sql='DROP INDEX blog_post_saved_by_user_idx',
+        ),
+    ]
@@ -1,13 +1,23 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import timedelta
 from taggit.managers import TaggableManager
+from taggit.models import Tag
 from cloudinary.models import CloudinaryField  # <-- Import CloudinaryField
 
 User = get_user_model()
 
 
+class MediaStatus(models.TextChoices):
+    READY = 'ready', 'Ready'
+    PROCESSING = 'processing', 'Processing'
+    FAILED = 'failed', 'Failed'
+
+
 # -----------------------------
 #  POST MODEL
 # -----------------------------
@@ -33,6 +43,10 @@ class Post(models.Model):
         null=True
     )
     # --- END UPDATED FIELDS ---
+    # Uploads run in the background (blog/media.py); 'processing' until swapped in.
+    media_status = models.CharField(
+        max_length=12, choices=MediaStatus.choices, default=MediaStatus.READY
+    )
     
     publish = models.DateTimeField(default=timezone.now)
     created = models.DateTimeField(auto_now_add=True)
@@ -42,21 +56,99 @@ class Post(models.Model):
     likes = models.ManyToManyField(User, related_name='liked_posts', blank=True)
     saved_by = models.ManyToManyField(User, related_name='saved_posts', blank=True)
 
+    # Denormalized counters, kept current with atomic F() updates.
+    # `python manage.py reconcile_post_counters` repairs any drift.
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+    save_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Bumped on every change that affects rendered output; part of the
+    # fragment cache key (see blog/fragments.py).
+    version = models.PositiveIntegerField(default=1, editable=False)
+
     # Tags
     tags = TaggableManager(blank=True)
 
     class Meta:
         ordering = ['-publish']
+        indexes = [
+            # Keyset pagination of the feed walks (publish, id) descending.
+            models.Index(fields=['-publish', '-id'], name='blog_post_feed_idx'),
+            # Profile grids walk one author's posts the same way.
+            models.Index(fields=['author', '-publish', '-id'], name='blog_post_author_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    # Only ever changed with F() updates. An ordinary save() leaves them
+    # out, so stale in-memory values never overwrite concurrent increments.
+    CONCURRENT_FIELDS = ('like_count', 'save_count', 'comment_count', 'version')
+
+    def save(self, *args, **kwargs):
+        if self._state.adding or kwargs.get('force_insert'):
+            super().save(*args, **kwargs)
+            return
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            update_fields = [field.name for field in self._meta.concrete_fields if not field.primary_key]
+        kwargs['update_fields'] = [name for name in update_fields if name not in self.CONCURRENT_FIELDS]
+        super().save(*args, **kwargs)
+        # Bumped after the new content is written, so a reader can never
+        # cache old content under the new fragment key.
+        Post.objects.filter(pk=self.pk).update(version=F('version') + 1)
+        self.refresh_from_db(fields=self.CONCURRENT_FIELDS)
+
+    def bump_version(self):
+        Post.objects.filter(pk=self.pk).update(version=F('version') + 1)
+        self.version += 1
+        from . import pagecache
+        pagecache.invalidate(pagecache.post_tag(self.pk))
+
     # --- Interaction Helpers ---
     def total_likes(self):
-        return self.likes.count()
+        return self.like_count
 
     def total_saves(self):
-        return self.saved_by.count()
+        return self.save_count
+
+    def bump_counter(self, field, delta):
+        Post.objects.filter(pk=self.pk).update(**{field: F(field) + delta, 'version': F('version') + 1})
+        setattr(self, field, getattr(self, field) + delta)
+        self.version += 1
+        if field == 'like_count':
+            # Likes also count towards the author's profile stats.
+            from accounts import stats
+            stats.bump(self.author_id, likes_received=delta)
+        from . import pagecache, trending
+        trending.refresh_post(self)
+        pagecache.invalidate(pagecache.post_tag(self.pk))
+
+    def _toggle_relation(self, relation, counter, user):
+        through = getattr(Post, relation).through.objects
+        with transaction.atomic():
+            removed, _ = through.filter(post=self, user=user).delete()
+            if removed:
+                self.bump_counter(counter, -1)
+                return False
+            try:
+                with transaction.atomic():
+                    through.create(post=self, user=user)
+            except IntegrityError:
+                # A concurrent request already added it.
+                return True
+            self.bump_counter(counter, 1)
+            if relation == 'likes':
+                from . import notifications
+                notifications.notify([(self.author_id, user.pk, NotificationVerb.LIKE, self.pk)])
+            return True
+
+    def toggle_like(self, user):
+        """Like or unlike for ``user``; returns the new liked state."""
+        return self._toggle_relation('likes', 'like_count', user)
+
+    def toggle_save(self, user):
+        """Save or unsave for ``user``; returns the new saved state."""
+        return self._toggle_relation('saved_by', 'save_count', user)
 
     def is_liked_by(self, user):
         return user.is_authenticated and self.likes.filter(id=user.id).exists()
@@ -89,10 +181,244 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created']
+        indexes = [
+            # Post detail pages a post's active comments newest first.
+            models.Index(fields=['post', 'active', '-created', '-id'], name='blog_comment_thread_idx'),
+            # The comments tab of the author's own profile.
+            models.Index(fields=['user', '-created', '-id'], name='blog_comment_user_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if self._state.adding or (update_fields is not None and 'active' not in update_fields):
+            super().save(*args, **kwargs)
+            return
+        # Hiding or restoring a comment (e.g. in the admin change form)
+        # moves it out of or back into Post.comment_count.
+        with transaction.atomic():
+            was_active = (
+                Comment.objects.select_for_update().filter(pk=self.pk)
+                .values_list('active', flat=True).first()
+            )
+            super().save(*args, **kwargs)
+            if was_active is not None and was_active != self.active:
+                self.post.bump_counter('comment_count', 1 if self.active else -1)
+
+    def __str__(self):
+        # Only local columns: admin lists render this for every row.
+        display_name = self.name or (f"user #{self.user_id}" if self.user_id else 'Anonymous')
+        return f"Comment by {display_name} on post #{self.post_id}"
+
+
+# -----------------------------
+#  TIMELINE MODEL
+# -----------------------------
+class TimelineEntry(models.Model):
+    """One post in one user's materialized "Following" timeline.
+
+    Rows are written when a post is created (fan-out on write), so reading
+    a timeline is a single range scan over ``(owner, publish, post)``.
+    """
+    owner = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='timeline_entries'
+    )
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    publish = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'post'], name='blog_timeline_owner_post_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', '-publish', '-post'], name='blog_timeline_owner_idx'),
+            models.Index(fields=['owner', 'author'], name='blog_timeline_author_idx'),
+        ]
+
+    def __str__(self):
+        return f"Post {self.post_id} in {self.owner_id}'s timeline"
+
+
+# -----------------------------
+#  TAG INDEX MODELS
+# -----------------------------
+# Denormalized copies of taggit's generic TaggedItem rows, so tag pages are
+# a plain range scan with no ContentType join. Kept in sync by
+# blog/tags.py whenever a post's tags change.
+class TagPost(models.Model):
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='+')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    publish = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'post'], name='blog_tagpost_tag_post_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['tag', '-publish', '-post'], name='blog_tagpost_feed_idx'),
+            models.Index(fields=['post'], name='blog_tagpost_post_idx'),
+        ]
+
+    def __str__(self):
+        return f"Post {self.post_id} tagged {self.tag_id}"
+
+
+class TagCount(models.Model):
+    tag = models.OneToOneField(Tag, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    post_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-post_count'], name='blog_tagcount_popular_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tag_id}: {self.post_count}"
+
+
+# -----------------------------
+#  TRENDING MODEL
+# -----------------------------
+class TrendingPost(models.Model):
+    """A recent post's precomputed trending score (see blog/trending.py).
+
+    Rebuilt in bulk by `rebuild_trending` and rescored one row at a time
+    when a post is liked, saved or commented on in between.
+    """
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    score = models.FloatField()
+    publish = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score', '-post'], name='blog_trending_rank_idx'),
+        ]
 
     def __str__(self):
-        display_name = self.name or (self.user.username if self.user else 'Anonymous')
-        return f"Comment by {display_name} on {self.post.title}"
+        return f"Post {self.post_id}: {self.score:.3f}"
+
+
+# -----------------------------
+#  MEDIA UPLOAD JOB MODEL
+# -----------------------------
+class MediaUploadJob(models.Model):
+    """A spooled upload waiting to be pushed to media storage.
+
+    ``target`` is the model label (e.g. ``blog.Post``) and ``field`` the
+    CloudinaryField on it that receives the result.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    target = models.CharField(max_length=50)
+    object_id = models.PositiveBigIntegerField()
+    field = models.CharField(max_length=50)
+    spool_path = models.CharField(max_length=500)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='blog_mediajob_due_idx'),
+            models.Index(fields=['target', 'object_id'], name='blog_mediajob_target_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.target}#{self.object_id}.{self.field} ({self.status})"
+
+
+# -----------------------------
+#  INTERACTION BUFFER MODEL
+# -----------------------------
+class InteractionIntent(models.Model):
+    """One like/save toggle waiting to be applied (see blog/interactions.py).
+
+    Rows are only ever inserted by requests and deleted by the flush, so a
+    burst of toggles on one post never contends on the post row itself.
+    """
+    class Kind(models.TextChoices):
+        LIKE = 'like', 'Like'
+        SAVE = 'save', 'Save'
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='+')
+    kind = models.CharField(max_length=4, choices=Kind.choices)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # A viewer's own pending toggles, overlaid on the pages they read.
+            models.Index(fields=['user', 'post'], name='blog_intent_user_post_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} toggle of post {self.post_id} by {self.user_id}"
+
+
+# -----------------------------
+#  NOTIFICATION MODELS
+# -----------------------------
+class NotificationVerb(models.TextChoices):
+    LIKE = 'like', 'liked your post'
+    COMMENT = 'comment', 'commented on your post'
+    FOLLOW = 'follow', 'started following you'
+
+
+class NotificationEvent(models.Model):
+    """A like, comment or follow waiting to be delivered (see blog/notifications.py)."""
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    verb = models.CharField(max_length=8, choices=NotificationVerb.choices)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.actor_id} {self.verb} -> {self.recipient_id}"
+
+
+class Notification(models.Model):
+    """One line in a user's notifications, possibly standing for many events.
+
+    While unread and younger than BLOG_NOTIFICATION_COLLAPSE_HOURS, further
+    events of the same verb on the same post fold into it. ``actors`` holds
+    everyone folded in so far, so a repeat actor is not counted twice;
+    ``actor`` is the latest new one and ``actor_count`` is ``len(actors)``.
+    """
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    actors = models.ManyToManyField(User, related_name='+', blank=True)
+    actor_count = models.PositiveIntegerField(default=1)
+    verb = models.CharField(max_length=8, choices=NotificationVerb.choices)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    read = models.BooleanField(default=False)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # The notifications page, most recently active first.
+            models.Index(fields=['recipient', '-updated', '-id'], name='blog_notif_inbox_idx'),
+            # Unread count and the rows new events may collapse into.
+            models.Index(
+                fields=['recipient', 'verb', 'post'], condition=models.Q(read=False),
+                name='blog_notif_unread_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.actor_id} (+{self.actor_count - 1}) {self.verb} -> {self.recipient_id}"
+
+    @property
+    def others(self):
+        return self.actor_count - 1
 
 
 # -----------------------------
@@ -109,6 +435,9 @@ class Story(models.Model):
         folder='stories/images'  # <-- Tells Cloudinary to use this folder
     )
     # --- END UPDATED FIELD ---
+    media_status = models.CharField(
+        max_length=12, choices=MediaStatus.choices, default=MediaStatus.READY
+    )
     
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()
@@ -116,6 +445,10 @@ class Story(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "Stories"
+        indexes = [
+            # Story tray and story viewer: active stories per author, newest first.
+            models.Index(fields=['author', 'expires_at', 'created_at'], name='blog_story_tray_idx'),
+        ]
 
     def __str__(self):
         return f"Story by {self.author.username} ({self.created_at.strftime('%Y-%m-%d %H:%M')})"
@@ -124,4 +457,111 @@ class Story(models.Model):
         # Automatically set expiry to 24 hours after creation
         if not self.id:
             self.expires_at = timezone.now() + timedelta(hours=24)
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created and instance.active:
+        instance.post.bump_counter('comment_count', 1)
+
+
+@receiver(post_save, sender=Comment)
+def notify_post_author(sender, instance, created, **kwargs):
+    if created and instance.user_id:
+        from . import notifications
+        notifications.notify([
+            (instance.post.author_id, instance.user_id, NotificationVerb.COMMENT, instance.post_id)
+        ])
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_deleted_comment(sender, instance, **kwargs):
+    if instance.active:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') - 1, version=F('version') + 1
+        )
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def bump_version_on_tag_change(sender, instance, action, reverse, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, Post):
+        instance.bump_version()
+
+
+# --- Full-text search index maintenance (see blog/search.py) ---
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, **kwargs):
+    from . import search
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    from . import search
+    search.remove_post(instance.pk)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def reindex_on_tag_change(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, Post):
+        from . import search
+        search.index_post(instance)
+
+
+@receiver(pre_save, sender=User)
+def remember_indexed_username(sender, instance, update_fields=None, **kwargs):
+    # Logins save only last_login; skip the lookup unless username may change.
+    if instance.pk and (update_fields is None or 'username' in update_fields):
+        instance._indexed_username = (
+            User.objects.filter(pk=instance.pk).values_list('username', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=User)
+def reindex_renamed_author(sender, instance, created, **kwargs):
+    # Usernames are indexed with every post of their author.
+    indexed = instance.__dict__.pop('_indexed_username', None)
+    if not created and indexed is not None and indexed != instance.username:
+        from . import search
+        search.reindex_author(instance.pk)
+
+
+# --- Tag index maintenance (see blog/tags.py) ---
+@receiver(m2m_changed, sender=Post.tags.through)
+def sync_tag_index(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, Post):
+        from . import tags
+        tags.sync_post_tags(instance)
+
+
+@receiver(pre_delete, sender=Post)
+def drop_from_tag_index(sender, instance, **kwargs):
+    from . import tags
+    tags.forget_post_tags(instance)
+
+
+# --- Profile stats maintenance (see accounts/stats.py) ---
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        from accounts import stats
+        stats.bump(instance.author_id, posts=1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_deleted_post(sender, instance, **kwargs):
+    from accounts import stats
+    stats.bump(instance.author_id, posts=-1, likes_received=-instance.like_count)
+
+
+# --- Anonymous page cache invalidation (see blog/pagecache.py) ---
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Story)
+@receiver(post_delete, sender=Story)
+def invalidate_cached_pages(sender, instance, **kwargs):
+    from . import pagecache
+    pagecache.invalidate(*pagecache.tags_for(instance))
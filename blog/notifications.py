@@ -0,0 +1,162 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification, NotificationEvent, NotificationVerb, Post
+
+NotificationActor = Notification.actors.through
+
+
+# -----------------------------
+#  NOTIFICATIONS
+# -----------------------------
+# Write paths only queue NotificationEvent rows; nobody waits on the
+# recipient's inbox. `python manage.py deliver_notifications` (or the
+# in-process BLOG_NOTIFICATIONS_EAGER mode) takes events in batches:
+#
+# - Events are grouped by (recipient, verb, post).
+# - A group folds into that recipient's open notification for the same
+#   key, if one exists. Open means unread and created within
+#   BLOG_NOTIFICATION_COLLAPSE_HOURS. Actors already on the row (someone
+#   who unliked and liked again) are skipped, so the count is of people.
+# - Otherwise the group becomes one new row.
+#
+# A post liked by thousands of people in a day therefore gives its author
+# one "X and 41 others liked your post" line, not thousands of rows.
+#
+# The unread count in the header is cached per user. It only changes when
+# a new row is created or the inbox is read, and both of those update it.
+# The delivery worker's delete only reaches web workers through a shared
+# cache, so entries are also short-lived: a lost delete corrects itself
+# within UNREAD_TIMEOUT.
+
+UNREAD_PREFIX = 'blog:unread:'
+UNREAD_TIMEOUT = 60
+
+
+def _unread_key(user_id) -> str:
+    return f'{UNREAD_PREFIX}{user_id}'
+
+
+def notify(events) -> None:
+    """Queue ``(recipient_id, actor_id, verb, post_id)`` events for delivery."""
+    rows = [
+        NotificationEvent(recipient_id=recipient_id, actor_id=actor_id, verb=verb, post_id=post_id)
+        for recipient_id, actor_id, verb, post_id in events
+        if recipient_id != actor_id
+    ]
+    if not rows:
+        return
+    NotificationEvent.objects.bulk_create(rows)
+    if settings.BLOG_NOTIFICATIONS_EAGER:
+        transaction.on_commit(deliver)
+
+
+def likes_added(pairs) -> None:
+    """Notify authors of new ``(post_id, user_id)`` likes."""
+    pairs = list(pairs)
+    authors = dict(Post.objects.filter(pk__in={post_id for post_id, _ in pairs}).values_list('id', 'author_id'))
+    notify(
+        (authors[post_id], user_id, NotificationVerb.LIKE, post_id)
+        for post_id, user_id in pairs if post_id in authors
+    )
+
+
+def follows_added(instance, reverse, pk_set) -> None:
+    """Notify the authors behind a ``Profile.followers`` post_add."""
+    from accounts.models import Profile
+
+    if reverse:
+        authors = Profile.objects.filter(pk__in=pk_set).values_list('user_id', flat=True)
+        notify((author_id, instance.pk, NotificationVerb.FOLLOW, None) for author_id in authors)
+    else:
+        notify((instance.user_id, follower_id, NotificationVerb.FOLLOW, None) for follower_id in pk_set)
+
+
+def deliver(*, batch_size=None) -> int:
+    """Fold up to ``batch_size`` of the oldest events into notifications; returns how many."""
+    batch_size = batch_size or settings.BLOG_NOTIFICATION_BATCH_SIZE
+    with transaction.atomic():
+        # Concurrent workers queue on the same oldest rows rather than
+        # delivering overlapping batches.
+        events = list(
+            NotificationEvent.objects.select_for_update().order_by('pk')
+            .values_list('pk', 'recipient_id', 'actor_id', 'verb', 'post_id')[:batch_size]
+        )
+        if not events:
+            return 0
+        # Actor ids per key, oldest first, each once.
+        bursts = {}
+        for _, recipient_id, actor_id, verb, post_id in events:
+            bursts.setdefault((recipient_id, verb, post_id), {})[actor_id] = None
+
+        now = timezone.now()
+        open_rows = {}
+        for row in (
+            Notification.objects.filter(
+                recipient_id__in={recipient_id for recipient_id, _, _ in bursts},
+                verb__in={verb for _, verb, _ in bursts},
+                read=False,
+                created__gte=now - timedelta(hours=settings.BLOG_NOTIFICATION_COLLAPSE_HOURS),
+            ).order_by('created').only('id', 'recipient_id', 'verb', 'post_id', 'actor_id', 'actor_count')
+        ):
+            open_rows[row.recipient_id, row.verb, row.post_id] = row
+
+        # Who is already on each open row. The latest actor counts too, for
+        # rows written before ``actors`` was tracked.
+        seen = {row.pk: {row.actor_id} for row in open_rows.values()}
+        for notification_id, user_id in NotificationActor.objects.filter(
+            notification_id__in=seen,
+            user_id__in={actor_id for actors in bursts.values() for actor_id in actors},
+        ).values_list('notification_id', 'user_id'):
+            seen[notification_id].add(user_id)
+
+        folded, created, added = [], [], []
+        for key, actors in bursts.items():
+            row = open_rows.get(key)
+            if row is None:
+                recipient_id, verb, post_id = key
+                row = Notification(
+                    recipient_id=recipient_id, actor_id=list(actors)[-1], actor_count=len(actors),
+                    verb=verb, post_id=post_id,
+                )
+                created.append((row, actors))
+                continue
+            fresh = [actor_id for actor_id in actors if actor_id not in seen[row.pk]]
+            if not fresh:
+                continue
+            row.actor_id = fresh[-1]
+            row.actor_count += len(fresh)
+            row.updated = now
+            folded.append(row)
+            added.extend(NotificationActor(notification_id=row.pk, user_id=actor_id) for actor_id in fresh)
+        Notification.objects.bulk_update(folded, ['actor', 'actor_count', 'updated'], batch_size=500)
+        Notification.objects.bulk_create([row for row, _ in created], batch_size=500)
+        added.extend(
+            NotificationActor(notification_id=row.pk, user_id=actor_id)
+            for row, actors in created for actor_id in actors
+        )
+        NotificationActor.objects.bulk_create(added, batch_size=500)
+        NotificationEvent.objects.filter(pk__in=[pk for pk, *_ in events]).delete()
+
+        stale = {_unread_key(row.recipient_id) for row, _ in created}
+        transaction.on_commit(lambda: cache.delete_many(list(stale)))
+    return len(events)
+
+
+def unread_count(user) -> int:
+    """Unread notifications for ``user``; a query only on a cache miss."""
+    key = _unread_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(recipient=user, read=False).count()
+        cache.set(key, count, UNREAD_TIMEOUT)
+    return count
+
+
+def mark_all_read(user) -> None:
+    Notification.objects.filter(recipient=user, read=False).update(read=True)
+    transaction.on_commit(lambda: cache.set(_unread_key(user.pk), 0, UNREAD_TIMEOUT))
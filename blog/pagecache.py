@@ -0,0 +1,165 @@
+import functools
+import uuid
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from .metrics import record_cache
+
+
+# -----------------------------
+#  ANONYMOUS FULL-PAGE CACHE
+# -----------------------------
+# Logged-out GETs of the busiest pages are served straight from the cache.
+# Each entry stores the tags of what it was built from ("post:12",
+# "user:7", "feed") along with the value each tag had at the time. Write
+# paths call invalidate() to give a tag a new value. Any entry whose stored
+# values no longer match is then treated as a miss, so one post change never
+# has to find every page that shows it. Tag values are written by web and
+# worker processes alike, so this only works with a shared cache backend
+# (CACHE_URL in settings; enforced by `check --deploy`).
+#
+# A page is only stored if rendering it did not use a CSRF token or set a
+# cookie, so nothing viewer-specific ends up in a shared entry. Appearance
+# preferences live in a cookie that is read client-side (see base.html), so
+# the markup is the same for every anonymous visitor.
+
+FEED = 'feed'
+ENTRY_PREFIX = 'blog:page:'
+TAG_PREFIX = 'blog:page-tag:'
+
+
+def post_tag(post_id) -> str:
+    return f'post:{post_id}'
+
+
+def user_tag(user_id) -> str:
+    return f'user:{user_id}'
+
+
+def feed_tags(posts) -> list:
+    """Tags of a feed page: FEED plus the tags of each post and author it lists."""
+    tags = dict.fromkeys([FEED])
+    for post in posts:
+        tags.update(dict.fromkeys([post_tag(post.pk), user_tag(post.author_id)]))
+    return list(tags)
+
+
+def tagged(response, *tags):
+    """Record the tags a view's response depends on; returns ``response``."""
+    response.page_cache_tags = tags
+    return response
+
+
+def invalidate(*tags) -> None:
+    cache.set_many({f'{TAG_PREFIX}{tag}': uuid.uuid4().hex for tag in tags}, None)
+
+
+def tags_for(instance) -> list:
+    """Tags of the cached pages that render ``instance``."""
+    label = instance._meta.label
+    if label == 'blog.Post':
+        return [FEED, post_tag(instance.pk), user_tag(instance.author_id)]
+    if label == 'blog.Comment':
+        return [post_tag(instance.post_id)]
+    if label == 'blog.Story':
+        return [user_tag(instance.author_id)]
+    if label == 'accounts.Profile':
+        return [user_tag(instance.user_id)]
+    return []
+
+
+def _cacheable(request) -> bool:
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+        # Flash messages are rendered into the page.
+        and CookieStorage.cookie_name not in request.COOKIES
+    )
+
+
+def _lookup(request):
+    entry = cache.get(ENTRY_PREFIX + request.get_full_path())
+    if entry is None:
+        return None
+    current = cache.get_many(list(entry['tags']))
+    if current != entry['tags']:
+        return None
+    response = HttpResponse(entry['content'], content_type=entry['content_type'])
+    response['X-Page-Cache'] = 'hit'
+    return response
+
+
+def _store(request, response) -> bool:
+    tags = getattr(response, 'page_cache_tags', None)
+    if (
+        tags is None
+        or response.status_code != 200
+        or response.streaming
+        or response.cookies
+        or request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    ):
+        return False
+    tag_keys = [f'{TAG_PREFIX}{tag}' for tag in tags]
+    current = cache.get_many(tag_keys)
+    missing = {key: uuid.uuid4().hex for key in tag_keys if key not in current}
+    if missing:
+        cache.set_many(missing, None)
+        current.update(missing)
+    cache.set(ENTRY_PREFIX + request.get_full_path(), {
+        'tags': current,
+        'content': response.content,
+        'content_type': response['Content-Type'],
+    }, settings.BLOG_PAGE_CACHE_TIMEOUT)
+    return True
+
+
+def _headers(response, public: bool):
+    if public:
+        patch_cache_control(response, public=True, max_age=settings.BLOG_PAGE_CACHE_MAX_AGE)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    # Logged-in and logged-out visitors get different pages for one URL.
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def _serve(request, view, args, kwargs):
+    if not _cacheable(request):
+        return _headers(view(request, *args, **kwargs), public=False)
+    response = _lookup(request)
+    record_cache('page', response is not None, response is None)
+    if response is not None:
+        return _headers(response, public=True)
+    response = view(request, *args, **kwargs)
+    return _headers(response, public=_store(request, response))
+
+
+def cache_anonymous(view):
+    """Serve ``view`` from the page cache for anonymous GETs.
+
+    The view marks its response with ``tagged(response, ...)``; untagged
+    responses (redirects, errors) are never stored.
+    """
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            request.user = await request.auser()
+            if not _cacheable(request):
+                return _headers(await view(request, *args, **kwargs), public=False)
+            response = await sync_to_async(_lookup)(request)
+            record_cache('page', response is not None, response is None)
+            if response is not None:
+                return _headers(response, public=True)
+            response = await view(request, *args, **kwargs)
+            return _headers(response, public=await sync_to_async(_store)(request, response))
+        return wrapped
+
+    @functools.wraps(view)
+    def wrapped(request, *args, **kwargs):
+        return _serve(request, view, args, kwargs)
+    return wrapped
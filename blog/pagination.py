@@ -0,0 +1,97 @@
+import base64
+import json
+from dataclasses import dataclass, field
+
+from django.core.exceptions import BadRequest, ValidationError
+from django.db.models import Q
+
+
+# -----------------------------
+#  KEYSET (CURSOR) PAGINATION
+# -----------------------------
+# Pages are addressed by the sort key of the last row shown instead of an
+# OFFSET, so page 500 costs the same single index range scan as page 1.
+
+
+@dataclass
+class KeysetPage:
+    items: list = field(default_factory=list)
+    next_cursor: str | None = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def _key_value(obj, key: str):
+    # Supports related keys such as "post__publish".
+    for attr in key.split('__'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def encode_cursor(values) -> str:
+    payload = [v.isoformat() if hasattr(v, 'isoformat') else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token: str, size: int) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise BadRequest('Invalid cursor.')
+    if not isinstance(values, list) or len(values) != size:
+        raise BadRequest('Invalid cursor.')
+    return values
+
+
+def _key_field(model, key: str):
+    # Follows related keys such as "post__publish" to the field they end on.
+    *path, name = key.split('__')
+    for attr in path:
+        model = model._meta.get_field(attr).related_model
+    return model._meta.get_field(name)
+
+
+def _cursor_values(model, cursor: str, keys) -> list:
+    """Decode ``cursor`` into one value per key, each converted to its field's type."""
+    values = decode_cursor(cursor, len(keys))
+    try:
+        values = [_key_field(model, key).to_python(value) for key, value in zip(keys, values)]
+    except (ValidationError, TypeError, ValueError):
+        raise BadRequest('Invalid cursor.')
+    if any(value is None for value in values):
+        raise BadRequest('Invalid cursor.')
+    return values
+
+
+def keyset_filter(queryset, cursor=None, *, keys=('publish', 'id')):
+    """Order ``queryset`` by ``keys`` descending and skip past ``cursor``."""
+    queryset = queryset.order_by(*[f'-{key}' for key in keys])
+    if cursor:
+        values = _cursor_values(queryset.model, cursor, keys)
+        after = Q()
+        for i, key in enumerate(keys):
+            step = Q(**{f'{key}__lt': values[i]})
+            for prev_key, prev_value in zip(keys[:i], values[:i]):
+                step &= Q(**{prev_key: prev_value})
+            after |= step
+        queryset = queryset.filter(after)
+    return queryset
+
+
+def paginate_keyset(queryset, cursor=None, *, keys=('publish', 'id'), page_size=12) -> KeysetPage:
+    """Return one page of ``queryset`` ordered by ``keys``, all descending.
+
+    The last key must be unique (normally the primary key) so ties on the
+    leading keys never skip or repeat rows.
+    """
+    queryset = keyset_filter(queryset, cursor, keys=keys)
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor([_key_value(items[-1], key) for key in keys])
+    return KeysetPage(items=items, next_cursor=next_cursor)
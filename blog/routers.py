@@ -0,0 +1,114 @@
+import random
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# -----------------------------
+#  PRIMARY / REPLICA ROUTING
+# -----------------------------
+# Writes always go to the primary ("default"). Reads go to a replica
+# (DATABASE_REPLICA_URLS, see settings) only inside a GET/HEAD request
+# handled by ReplicaMiddleware. Management commands, workers and
+# tests keep every query on the primary.
+#
+# Read-your-writes: once a request writes anything, the rest of that
+# request reads from the primary. The response also sets a short-lived
+# signed cookie, so the user's next requests stay on the primary for
+# BLOG_REPLICA_STICKY_SECONDS, until replication has caught up.
+
+PIN_COOKIE = 'blog_primary'
+
+
+@dataclass
+class _RequestState:
+    pinned: bool
+    wrote: bool = False
+
+
+_state: ContextVar[_RequestState | None] = ContextVar('blog_db_state', default=None)
+
+
+def replica_aliases() -> list:
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        replicas = replica_aliases()
+        if (
+            state is None or state.pinned or state.wrote or not replicas
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+
+def _pinned_by_cookie(request) -> bool:
+    try:
+        until = float(request.get_signed_cookie(PIN_COOKIE, salt=PIN_COOKIE))
+    except (KeyError, ValueError, signing.BadSignature):
+        return False
+    return until > time.time()
+
+
+class ReplicaMiddleware:
+    """Let safe requests read from replicas, except just after a write."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _begin(self, request):
+        pinned = request.method not in ('GET', 'HEAD') or _pinned_by_cookie(request)
+        state = _RequestState(pinned=pinned)
+        return state, _state.set(state)
+
+    def _finish(self, state, response):
+        if state.wrote and replica_aliases():
+            window = settings.BLOG_REPLICA_STICKY_SECONDS
+            response.set_signed_cookie(
+                PIN_COOKIE, str(time.time() + window), salt=PIN_COOKIE,
+                max_age=window, httponly=True, samesite='Lax',
+            )
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        state, token = self._begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(state, response)
+
+    async def __acall__(self, request):
+        state, token = self._begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(state, response)
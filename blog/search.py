@@ -0,0 +1,195 @@
+import re
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import BadRequest
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import strip_tags
+
+from .models import Post
+from .pagination import KeysetPage, decode_cursor, encode_cursor, paginate_keyset
+
+
+# -----------------------------
+#  FULL-TEXT SEARCH
+# -----------------------------
+# PostgreSQL: a `search_vector` tsvector column on blog_post with a GIN index.
+# SQLite: an FTS5 shadow table `blog_post_fts` keyed by the post id.
+# Both are created by migration 0013 and kept current by the signals in
+# blog/models.py; `python manage.py reindex_search` rebuilds them.
+# Other backends fall back to icontains scans.
+#
+# Results are ordered by (score, id) descending and keyset-paginated on it.
+
+FTS_TABLE = 'blog_post_fts'
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+_PG_VECTOR = """
+    setweight(to_tsvector('english', p.title), 'A') ||
+    setweight(to_tsvector('english', regexp_replace(p.body, '<[^>]*>', ' ', 'g')), 'B') ||
+    setweight(to_tsvector('simple', coalesce((
+        SELECT string_agg(t.name, ' ')
+        FROM taggit_taggeditem ti JOIN taggit_tag t ON t.id = ti.tag_id
+        WHERE ti.content_type_id = %s AND ti.object_id = p.id
+    ), '')), 'C') ||
+    setweight(to_tsvector('simple', u.username), 'C')
+"""
+
+
+_backends = {}  # (vendor, database name) -> backend, filled once per process
+
+
+def backend() -> str:
+    key = (connection.vendor, connection.settings_dict['NAME'])
+    kind = _backends.get(key)
+    if kind is None:
+        if connection.vendor == 'postgresql':
+            kind = 'postgresql'
+        elif connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+            kind = 'sqlite'
+        else:
+            # Not remembered: the FTS table may simply not be migrated yet.
+            return 'fallback'
+        _backends[key] = kind
+    return kind
+
+
+def _post_content_type_id() -> int:
+    return ContentType.objects.get_for_model(Post).pk
+
+
+# --- Index maintenance ---
+def _reindex(condition: str, params: list, stale: str, stale_params: list) -> None:
+    """(Re)index the posts ``p`` matching ``condition``.
+
+    On SQLite the FTS rows matching ``stale`` are dropped first, so deleted
+    posts in the range go too.
+    """
+    kind = backend()
+    if kind == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE blog_post p SET search_vector = {_PG_VECTOR}
+                FROM auth_user u
+                WHERE u.id = p.author_id AND {condition}
+                """,
+                [_post_content_type_id(), *params],
+            )
+    elif kind == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT p.id, p.title, p.body, u.username, (
+                    SELECT group_concat(t.name, ' ')
+                    FROM taggit_taggeditem ti JOIN taggit_tag t ON t.id = ti.tag_id
+                    WHERE ti.content_type_id = %s AND ti.object_id = p.id
+                )
+                FROM blog_post p JOIN auth_user u ON u.id = p.author_id
+                WHERE {condition}
+                """,
+                [_post_content_type_id(), *params],
+            )
+            rows = [
+                (pk, title, strip_tags(body), tags or '', username)
+                for pk, title, body, username, tags in cursor.fetchall()
+            ]
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE {stale}', stale_params)
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, body, tags, author) VALUES (%s, %s, %s, %s, %s)',
+                rows,
+            )
+
+
+def reindex_range(first_id: int, last_id: int) -> None:
+    """(Re)index every post with ``first_id <= id <= last_id``."""
+    _reindex('p.id BETWEEN %s AND %s', [first_id, last_id], 'rowid BETWEEN %s AND %s', [first_id, last_id])
+
+
+def reindex_author(author_id: int) -> None:
+    """(Re)index every post by ``author_id``, e.g. after a username change."""
+    _reindex(
+        'p.author_id = %s', [author_id],
+        'rowid IN (SELECT id FROM blog_post WHERE author_id = %s)', [author_id],
+    )
+
+
+def index_post(post) -> None:
+    reindex_range(post.pk, post.pk)
+
+
+def remove_post(post_id: int) -> None:
+    if backend() == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+    # The PostgreSQL vector lives on the row itself and goes with it.
+
+
+# --- Querying ---
+def _terms(query: str) -> list:
+    return _TERM_RE.findall(query.lower())[:16]
+
+
+def _ranked_ids(sql: str, params: list, cursor, page_size: int) -> list:
+    """Run ``sql`` (yielding id, score) with a (score, id) keyset applied."""
+    where = ''
+    if cursor:
+        score, last_id = decode_cursor(cursor, 2)
+        try:
+            score, last_id = float(score), int(last_id)
+        except (TypeError, ValueError):
+            raise BadRequest('Invalid cursor.')
+        where = 'WHERE score < %s OR (score = %s AND id < %s)'
+        params = params + [score, score, last_id]
+    with connection.cursor() as db:
+        db.execute(
+            f'SELECT id, score FROM ({sql}) ranked {where} ORDER BY score DESC, id DESC LIMIT %s',
+            params + [page_size + 1],
+        )
+        return db.fetchall()
+
+
+def search_posts(query: str, cursor=None, page_size=12) -> KeysetPage:
+    """Ranked, keyset-paginated posts matching ``query``."""
+    terms = _terms(query)
+    if not terms:
+        return KeysetPage()
+
+    kind = backend()
+    if kind == 'fallback':
+        match = Q()
+        for term in terms:
+            match &= (
+                Q(title__icontains=term) | Q(body__icontains=term)
+                | Q(tags__name__iexact=term) | Q(author__username__iexact=term)
+            )
+        queryset = Post.objects.filter(match).distinct().select_related('author', 'author__profile')
+        return paginate_keyset(queryset, cursor, keys=('publish', 'id'), page_size=page_size)
+
+    if kind == 'postgresql':
+        # Title and body are indexed with the 'english' config, tags and the
+        # username with 'simple'; each term may match either, all must match.
+        tsquery = ' && '.join(
+            "(plainto_tsquery('english', %s) || plainto_tsquery('simple', %s))" for _ in terms
+        )
+        sql = (
+            "SELECT p.id AS id, ts_rank(p.search_vector, query.q)::float8 AS score "
+            f"FROM blog_post p, (SELECT {tsquery} AS q) query "
+            "WHERE p.search_vector @@ query.q"
+        )
+        params = [term for term in terms for _ in range(2)]
+    else:
+        sql = (
+            f"SELECT rowid AS id, -bm25({FTS_TABLE}, 10.0, 4.0, 2.0, 2.0) AS score "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+        )
+        params = [' '.join(f'"{term}"' for term in terms)]
+
+    rows = _ranked_ids(sql, params, cursor, page_size)
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last_id, last_score = rows[-1]
+        next_cursor = encode_cursor([last_score, last_id])
+    posts = Post.objects.select_related('author', 'author__profile').in_bulk([pk for pk, _ in rows])
+    return KeysetPage(items=[posts[pk] for pk, _ in rows if pk in posts], next_cursor=next_cursor)
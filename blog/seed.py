@@ -0,0 +1,190 @@
+import random
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from taggit.models import Tag, TaggedItem
+
+from accounts import stats
+from accounts.models import Profile
+
+from . import search
+from .models import Comment, Post, Story, TagCount, TagPost, TimelineEntry
+
+User = get_user_model()
+
+
+# -----------------------------
+#  SYNTHETIC DATASETS
+# -----------------------------
+# Builds users, follows, posts, tags, likes, saves, comments and stories with
+# bulk_create only, then fills in everything the per-row signals would have
+# maintained: profiles, denormalized counters, profile stats, timelines, tag
+# index tables and the search index. Used by `seed_data` and `bench_views`.
+
+WORDS = (
+    'light street morning coffee city river night film travel mountain '
+    'sunset studio portrait garden market winter summer notes design code '
+    'music books ocean road window friends recipe weekend photo sketch'
+).split()
+SEED_PASSWORD = 'seed-password'
+
+
+def _sentence(rng, low, high):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def _bulk(model, rows, batch_size, **kwargs):
+    return model.objects.bulk_create(rows, batch_size=batch_size, **kwargs)
+
+
+def seed_dataset(
+    *, users, posts_per_user=10, follows_per_user=20, likes_per_post=8, saves_per_post=2,
+    comments_per_post=3, tags=50, tags_per_post=3, story_ratio=0.3, prefix='seed',
+    rng_seed=0, batch_size=2000,
+) -> dict:
+    """Create one dataset and return the number of rows written per kind.
+
+    Per-user and per-post figures are averages; actual values are drawn
+    around them so the data has the usual long tail. ``story_ratio`` is the
+    share of users with an active story.
+    """
+    rng = random.Random(rng_seed)
+    now = timezone.now()
+    run = f'{prefix}{rng.getrandbits(24):06x}'
+    password = make_password(SEED_PASSWORD)
+
+    with transaction.atomic():
+        people = _bulk(User, [
+            User(username=f'{run}_{i}', email=f'{run}_{i}@example.com', password=password,
+                 first_name=rng.choice(WORDS).title())
+            for i in range(users)
+        ], batch_size)
+        user_ids = [user.pk for user in people]
+        profiles = _bulk(Profile, [Profile(user_id=user_id) for user_id in user_ids], batch_size)
+        profile_of = {profile.user_id: profile.pk for profile in profiles}
+
+        # Follows: popularity is skewed so a few authors collect most of them.
+        weights = [1 / (rank + 1) for rank in range(len(user_ids))]
+        followers_of = defaultdict(set)
+        for follower_id in user_ids:
+            count = min(len(user_ids) - 1, int(rng.expovariate(1 / max(follows_per_user, 1))))
+            for author_id in rng.choices(user_ids, weights=weights, k=count):
+                if author_id != follower_id:
+                    followers_of[author_id].add(follower_id)
+        _bulk(Profile.followers.through, [
+            Profile.followers.through(profile_id=profile_of[author_id], user_id=follower_id)
+            for author_id, followers in followers_of.items()
+            for follower_id in followers
+        ], batch_size)
+
+        # Tags
+        names = [f'{rng.choice(WORDS)}{i}' for i in range(tags)]
+        _bulk(Tag, [Tag(name=name, slug=slugify(name)) for name in names], batch_size, ignore_conflicts=True)
+        tag_ids = list(Tag.objects.filter(name__in=names).values_list('pk', flat=True))
+
+        # Posts, with their interaction sets drawn up front so the
+        # denormalized counters can be written in the same INSERT.
+        drafts = []
+        for author_id in user_ids:
+            for _ in range(int(rng.expovariate(1 / posts_per_user)) if posts_per_user else 0):
+                drafts.append({
+                    'author_id': author_id,
+                    'publish': now - timedelta(seconds=rng.randint(0, 30 * 24 * 3600)),
+                    'likes': set(rng.sample(user_ids, min(len(user_ids), int(rng.expovariate(1 / likes_per_post)))))
+                    if likes_per_post else set(),
+                    'saves': set(rng.sample(user_ids, min(len(user_ids), int(rng.expovariate(1 / saves_per_post)))))
+                    if saves_per_post else set(),
+                    'comments': int(rng.expovariate(1 / comments_per_post)) if comments_per_post else 0,
+                    'tags': set(rng.sample(tag_ids, min(len(tag_ids), rng.randint(0, tags_per_post * 2)))),
+                })
+        posts = _bulk(Post, [
+            Post(
+                author_id=draft['author_id'], title=_sentence(rng, 2, 6).capitalize(),
+                body=f"<p>{_sentence(rng, 20, 80)}</p>", publish=draft['publish'],
+                like_count=len(draft['likes']), save_count=len(draft['saves']),
+                comment_count=draft['comments'],
+            )
+            for draft in drafts
+        ], batch_size)
+
+        post_type = ContentType.objects.get_for_model(Post)
+        _bulk(Post.likes.through, [
+            Post.likes.through(post_id=post.pk, user_id=user_id)
+            for post, draft in zip(posts, drafts) for user_id in draft['likes']
+        ], batch_size)
+        _bulk(Post.saved_by.through, [
+            Post.saved_by.through(post_id=post.pk, user_id=user_id)
+            for post, draft in zip(posts, drafts) for user_id in draft['saves']
+        ], batch_size)
+        _bulk(Comment, [
+            Comment(post_id=post.pk, user_id=rng.choice(user_ids), body=_sentence(rng, 3, 25))
+            for post, draft in zip(posts, drafts) for _ in range(draft['comments'])
+        ], batch_size)
+        _bulk(TaggedItem, [
+            TaggedItem(content_type=post_type, object_id=post.pk, tag_id=tag_id)
+            for post, draft in zip(posts, drafts) for tag_id in draft['tags']
+        ], batch_size)
+        _bulk(TagPost, [
+            TagPost(tag_id=tag_id, post_id=post.pk, publish=post.publish)
+            for post, draft in zip(posts, drafts) for tag_id in draft['tags']
+        ], batch_size)
+        tag_counts = Counter(tag_id for draft in drafts for tag_id in draft['tags'])
+        _bulk(TagCount, [TagCount(tag_id=tag_id, post_count=0) for tag_id in tag_counts], batch_size,
+              ignore_conflicts=True)
+        counts = {count.pk: count for count in TagCount.objects.filter(pk__in=tag_counts)}
+        for tag_id, added in tag_counts.items():
+            counts[tag_id].post_count += added
+        TagCount.objects.bulk_update(counts.values(), ['post_count'], batch_size=batch_size)
+
+        # Fan-out timelines: each post lands with its author and followers,
+        # except for authors big enough to be read-merged (blog/timeline.py).
+        read_authors = [
+            author_id for author_id, followers in followers_of.items()
+            if len(followers) > settings.BLOG_FANOUT_MAX_FOLLOWERS
+        ]
+        Profile.objects.filter(user_id__in=read_authors).update(fanout_on_read=True)
+        read_authors = set(read_authors)
+        entries = 0
+        batch = []
+        for post in posts:
+            owners = {post.author_id}
+            if post.author_id not in read_authors:
+                owners |= followers_of[post.author_id]
+            for owner_id in owners:
+                batch.append(TimelineEntry(owner_id=owner_id, post_id=post.pk, author_id=post.author_id,
+                                           publish=post.publish))
+            if len(batch) >= batch_size:
+                entries += len(_bulk(TimelineEntry, batch, batch_size))
+                batch = []
+        entries += len(_bulk(TimelineEntry, batch, batch_size))
+
+        stories = _bulk(Story, [
+            Story(author_id=user_id, image='stories/images/seed', expires_at=now + timedelta(hours=rng.randint(1, 23)))
+            for user_id in user_ids
+            if rng.random() < story_ratio
+        ], batch_size)
+
+    stats.rebuild(user_ids)
+    if posts:
+        first, last = min(post.pk for post in posts), max(post.pk for post in posts)
+        for start in range(first, last + 1, batch_size):
+            search.reindex_range(start, start + batch_size - 1)
+
+    return {
+        'users': len(people),
+        'follows': sum(len(followers) for followers in followers_of.values()),
+        'posts': len(posts),
+        'likes': sum(len(draft['likes']) for draft in drafts),
+        'saves': sum(len(draft['saves']) for draft in drafts),
+        'comments': sum(draft['comments'] for draft in drafts),
+        'taggings': sum(len(draft['tags']) for draft in drafts),
+        'timeline entries': entries,
+        'stories': len(stories),
+    }
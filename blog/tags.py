@@ -0,0 +1,49 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F
+from taggit.models import TaggedItem
+
+from .models import Post, TagCount, TagPost
+
+
+def _adjust_counts(tag_ids, delta):
+    if not tag_ids:
+        return
+    if delta > 0:
+        TagCount.objects.bulk_create(
+            [TagCount(tag_id=tag_id) for tag_id in tag_ids], ignore_conflicts=True
+        )
+    TagCount.objects.filter(tag_id__in=tag_ids).update(post_count=F('post_count') + delta)
+
+
+def sync_post_tags(post):
+    """Bring TagPost/TagCount in line with ``post``'s taggit rows."""
+    current = set(
+        TaggedItem.objects.filter(
+            content_type=ContentType.objects.get_for_model(Post), object_id=post.pk
+        ).values_list('tag_id', flat=True)
+    )
+    with transaction.atomic():
+        indexed = set(TagPost.objects.filter(post=post).values_list('tag_id', flat=True))
+        added, removed = current - indexed, indexed - current
+        if removed:
+            TagPost.objects.filter(post=post, tag_id__in=removed).delete()
+            _adjust_counts(removed, -1)
+        if added:
+            TagPost.objects.bulk_create(
+                [TagPost(tag_id=tag_id, post=post, publish=post.publish) for tag_id in added]
+            )
+            _adjust_counts(added, 1)
+
+
+def forget_post_tags(post):
+    """Decrement tag counts for a post about to be deleted."""
+    _adjust_counts(list(TagPost.objects.filter(post=post).values_list('tag_id', flat=True)), -1)
+
+
+def trending_tags(limit=10):
+    return list(
+        TagCount.objects.filter(post_count__gt=0)
+        .select_related('tag')
+        .order_by('-post_count')[:limit]
+    )
@@ -0,0 +1,40 @@
+from django import template
+from django.template.loader import render_to_string
+from django.utils.timesince import timesince
+
+from blog.fragments import cached_fragments, stitch
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_tiles(context, posts):
+    """Render feed tiles from the fragment cache plus per-viewer actions."""
+    request = context.get('request')
+    tiles = cached_fragments(
+        'tile', posts, lambda post: render_to_string('blog/post_tile.html', {'post': post}),
+        prefetch=['tags'],
+    )
+    feed_path = context.get('feed_path') or (request.get_full_path() if request else '')
+    html = []
+    for post in posts:
+        actions = render_to_string(
+            'blog/post_tile_actions.html',
+            {'post': post, 'feed_path': feed_path},
+            request=request,
+        )
+        html.append(stitch(tiles[post.pk], age=timesince(post.publish), actions=actions))
+    return stitch(''.join(html))
+
+
+@register.simple_tag(takes_context=True)
+def post_detail_body(context, post):
+    """Render the cached header, media and body of ``post_detail``."""
+    request = context.get('request')
+    body = cached_fragments(
+        'detail', [post], lambda post: render_to_string('blog/post_detail_body.html', {'post': post})
+    )[post.pk]
+    owner_actions = ''
+    if request and request.user == post.author:
+        owner_actions = render_to_string('blog/post_detail_owner_actions.html', {'post': post})
+    return stitch(body, owner_actions=owner_actions)
@@ -0,0 +1,34 @@
+from django import template
+from django.conf import settings
+from django.utils.html import format_html
+
+from blog.media import get_uploader
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(image, preset, alt='', css_class='', sizes=None, loading='lazy'):
+    """``<picture>`` with WebP/JPEG srcsets for a CloudinaryField value.
+
+    ``preset`` names an entry of BLOG_IMAGE_PRESETS; pass ``loading="eager"``
+    for the image that is likely the largest paint on the page.
+    """
+    if not image:
+        return ''
+    config = settings.BLOG_IMAGE_PRESETS[preset]
+    sizes = sizes or config['sizes']
+    sources = get_uploader().image_sources(image, config['widths'])
+    class_attr = format_html(' class="{}"', css_class) if css_class else ''
+    if 'jpg' not in sources:
+        return format_html(
+            '<img src="{}" alt="{}" loading="{}" decoding="async"{}>',
+            sources['src'], alt, loading, class_attr,
+        )
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="{}" decoding="async"{}>'
+        '</picture>',
+        sources['webp'], sizes, sources['src'], sources['jpg'], sizes, alt, loading, class_attr,
+    )
@@ -1,3 +1,868 @@
-from django.test import TestCase
+import base64
+import inspect
+import io
+import json
+import os
+import re
+import runpy
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from cloudinary import CloudinaryResource
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core import signing
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from blog_project import settings as project_settings
+
+from . import (
+    async_views, interactions, media, metrics, notifications, pagecache, routers, search, timeline, trending, views,
+)
+from .admin import EstimatedCountPaginator, chunked_pks
+from .aio import concurrently
+from .fragments import fragment_key
+from .models import (
+    Comment, InteractionIntent, MediaStatus, MediaUploadJob, Notification, NotificationVerb, Post, Story, TagCount,
+    TagPost, TimelineEntry, TrendingPost,
+)
+from .pagination import encode_cursor
+from .search import search_posts
+from .tags import trending_tags
+
+User = get_user_model()
+
+
+class BlogTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', password='pw')
+        self.reader = User.objects.create_user('reader', password='pw')
+        self.post = Post.objects.create(author=self.author, title='Hello', body='First post.')
+        self.client.force_login(self.reader)
+
+
+class SynchronousInteractionTests(BlogTestCase):
+    def test_buffering_is_off_by_default(self):
+        self.assertFalse(settings.BLOG_INTERACTIONS_BUFFERED)
+
+    def test_like_applies_inside_the_request(self):
+        self.client.post(reverse('post_toggle_like', args=[self.post.pk]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertTrue(self.post.likes.filter(pk=self.reader.pk).exists())
+        self.assertFalse(InteractionIntent.objects.exists())
+
+        self.client.post(reverse('post_toggle_like', args=[self.post.pk]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+        self.assertFalse(self.post.likes.exists())
+
+    def test_save_applies_inside_the_request(self):
+        self.client.post(reverse('post_toggle_save', args=[self.post.pk]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.save_count, 1)
+        self.assertTrue(self.post.saved_by.filter(pk=self.reader.pk).exists())
+
+    def test_toggle_on_missing_post_is_404(self):
+        response = self.client.post(reverse('post_toggle_like', args=[self.post.pk + 1000]))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(BLOG_INTERACTIONS_BUFFERED=True)
+class BufferedInteractionTests(BlogTestCase):
+    def api_detail(self, **headers):
+        return self.client.get(reverse('api_post_detail', args=[self.post.pk]), headers=headers)
+
+    def test_toggle_is_buffered_until_flush(self):
+        self.client.post(reverse('post_toggle_like', args=[self.post.pk]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+        self.assertEqual(InteractionIntent.objects.count(), 1)
+
+        self.assertEqual(interactions.flush(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertTrue(self.post.likes.filter(pk=self.reader.pk).exists())
+        self.assertFalse(InteractionIntent.objects.exists())
+
+    def test_repeated_toggles_cancel_out(self):
+        for _ in range(3):
+            interactions.toggle(self.reader, self.post.pk, InteractionIntent.Kind.SAVE)
+        interactions.toggle(self.author, self.post.pk, InteractionIntent.Kind.SAVE)
+        interactions.toggle(self.author, self.post.pk, InteractionIntent.Kind.SAVE)
+        interactions.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.save_count, 1)
+        self.assertEqual(list(self.post.saved_by.all()), [self.reader])
+
+    def test_pending_toggle_is_overlaid_and_changes_the_etag(self):
+        first = self.api_detail()
+        self.assertFalse(first.json()['liked'])
+
+        self.client.post(reverse('post_toggle_like', args=[self.post.pk]))
+        pending = self.api_detail(if_none_match=first['ETag'])
+        self.assertEqual(pending.status_code, 200)
+        self.assertTrue(pending.json()['liked'])
+
+        interactions.flush()
+        flushed = self.api_detail(if_none_match=pending['ETag'])
+        self.assertEqual(flushed.status_code, 200)
+        self.assertTrue(flushed.json()['liked'])
+        self.assertEqual(self.api_detail(if_none_match=flushed['ETag']).status_code, 304)
+
+
+class QueryBudgetTests(BlogTestCase):
+    """Page query counts are fixed: they do not grow with the posts shown."""
+
+    def add_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(author=self.author, title=f'Post {i}', body='Body')
+            post.tags.add('django', f'tag{i}')
+            post.toggle_like(self.reader)
+            Comment.objects.create(post=post, user=self.reader, body='Nice.')
+
+    def assertBudget(self, path, budget):
+        for count in (1, 10):
+            self.add_posts(count)
+            cache.clear()
+            with self.assertNumQueries(budget):
+                response = self.client.get(path)
+            self.assertEqual(response.status_code, 200)
+
+    def test_feed(self):
+        self.assertBudget(reverse('post_list'), 11)
+
+    def test_post_detail(self):
+        self.assertBudget(reverse('post_detail', args=[self.post.pk]), 9)
+
+    def test_api_feed(self):
+        self.assertBudget(reverse('api_feed'), 5)
+
+    def test_api_post_detail(self):
+        self.assertBudget(reverse('api_post_detail', args=[self.post.pk]), 6)
+
+
+def raw_cursor(values) -> str:
+    """A well-formed cursor token around arbitrary ``values``."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+@override_settings(BLOG_FEED_PAGE_SIZE=2)
+class CursorTests(BlogTestCase):
+    def test_feed_pages_cover_every_post_once(self):
+        publish = timezone.now() - timedelta(hours=1)
+        for i in range(4):
+            # Ties on publish are broken by id.
+            Post.objects.create(author=self.author, title=f'Tie {i}', body='Body', publish=publish)
+        expected = list(Post.objects.order_by('-publish', '-id').values_list('id', flat=True))
+
+        seen, cursor = [], None
+        while True:
+            response = self.client.get(reverse('api_feed'), {'cursor': cursor} if cursor else {})
+            self.assertEqual(response.status_code, 200)
+            seen += [post['id'] for post in response.json()['results']]
+            cursor = response.json()['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_cursor_encodes_datetimes(self):
+        post = Post.objects.get(pk=self.post.pk)
+        token = encode_cursor([post.publish, post.pk])
+        response = self.client.get(reverse('api_feed'), {'cursor': token})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
+
+    def test_bad_cursors_are_rejected(self):
+        tokens = [
+            'not base64!',
+            raw_cursor({'publish': 1}),
+            raw_cursor([1]),
+            raw_cursor(['notadate', 1]),
+            raw_cursor(['x', 'y']),
+            raw_cursor([None, 1]),
+        ]
+        for path in (reverse('post_list'), reverse('trending_feed'), reverse('api_feed')):
+            for token in tokens:
+                with self.subTest(path=path, token=token), self.assertLogs('django.request', 'WARNING'):
+                    self.assertEqual(self.client.get(path, {'cursor': token}).status_code, 400)
+
+    def test_bad_search_cursor_is_rejected(self):
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.get(reverse('search'), {'q': 'hello', 'cursor': raw_cursor(['x', 1])})
+        self.assertEqual(response.status_code, 400)
+
+
+class CounterConsistencyTests(BlogTestCase):
+    def assertCounts(self, likes=0, comments=0):
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.like_count, post.likes.count())
+        self.assertEqual(post.comment_count, post.comments.filter(active=True).count())
+        self.assertEqual((post.like_count, post.comment_count), (likes, comments))
+
+    def test_like_updates_post_and_author_stats(self):
+        self.client.post(reverse('post_toggle_like', args=[self.post.pk]))
+        self.assertCounts(likes=1)
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.likes_received, 1)
+
+        self.client.post(reverse('post_toggle_like', args=[self.post.pk]))
+        self.assertCounts(likes=0)
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.likes_received, 0)
+
+    def test_comment_added_hidden_and_deleted(self):
+        self.client.post(reverse('post_add_comment', args=[self.post.pk]), {'body': 'Great post.'})
+        self.assertCounts(comments=1)
+
+        comment = Comment.objects.get(post=self.post)
+        comment.active = False
+        comment.save()
+        self.assertCounts(comments=0)
+        comment.active = True
+        comment.save()
+        self.assertCounts(comments=1)
+
+        comment.delete()
+        self.assertCounts(comments=0)
+
+    def test_stale_save_keeps_concurrent_counts(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        self.post.toggle_like(self.reader)
+        version = Post.objects.get(pk=self.post.pk).version
+
+        stale.title = 'Edited'
+        stale.save()
+        self.assertCounts(likes=1)
+        self.assertEqual(stale.like_count, 1)
+        self.assertEqual(stale.version, version + 1)
+
+    def test_delete_post_updates_author_stats(self):
+        self.post.toggle_like(self.reader)
+        self.client.force_login(self.author)
+        self.client.post(reverse('post_delete', args=[self.post.pk]))
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+        self.author.stats.refresh_from_db()
+        self.assertEqual((self.author.stats.posts, self.author.stats.likes_received), (0, 0))
+
+
+class TimelineRebuildTests(BlogTestCase):
+    def test_rebuild_backfills_existing_follows(self):
+        self.author.profile.followers.add(self.reader)
+        TimelineEntry.objects.all().delete()
+        timeline.rebuild()
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list('owner_id', 'post_id')),
+            {(self.author.pk, self.post.pk), (self.reader.pk, self.post.pk)},
+        )
+        page = timeline.following_page(self.reader)
+        self.assertEqual([post.pk for post in page.items], [self.post.pk])
+
+
+class FragmentKeyTests(BlogTestCase):
+    def test_author_rename_changes_the_key(self):
+        post = Post.objects.select_related('author', 'author__profile').get(pk=self.post.pk)
+        before = fragment_key('tile', post)
+        self.author.username = 'renamed'
+        self.author.save()
+        post = Post.objects.select_related('author', 'author__profile').get(pk=self.post.pk)
+        self.assertNotEqual(fragment_key('tile', post), before)
+
+
+def png_upload(name='photo.png', size=(64, 48)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'teal').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class FailingUploader:
+    def upload(self, path, *, resource_type, options):
+        raise ConnectionError("storage unreachable")
+
+
+class OfflineMediaTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=media_root,
+            BLOG_MEDIA_SPOOL_DIR=media_root / 'spool',
+            BLOG_MEDIA_UPLOADER='blog.media.LocalUploader',
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.media_root = media_root
+        self.client.force_login(self.author)
+
+    def create_post(self):
+        return self.client.post(reverse('post_create'), {'title': 'Photo', 'body': 'Body', 'image': png_upload()})
+
+    @override_settings(BLOG_MEDIA_EAGER=True)
+    def test_eager_upload_runs_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_post()
+        post = Post.objects.get(title='Photo')
+        job = MediaUploadJob.objects.get(object_id=post.pk)
+        self.assertEqual(job.status, MediaUploadJob.Status.DONE)
+        self.assertEqual(post.media_status, MediaStatus.READY)
+        self.assertTrue(str(post.image))
+        self.assertFalse(Path(job.spool_path).exists())
+        self.assertTrue(any(self.media_root.glob('posts/images/*.png')))
+
+    def test_worker_upload_leaves_post_processing_until_run(self):
+        self.create_post()
+        post = Post.objects.get(title='Photo')
+        self.assertEqual(post.media_status, MediaStatus.PROCESSING)
+        self.assertFalse(post.image)
+
+        job = MediaUploadJob.objects.get(object_id=post.pk)
+        self.assertTrue(media.process_job(job.pk))
+        post.refresh_from_db()
+        self.assertEqual(post.media_status, MediaStatus.READY)
+        self.assertTrue(str(post.image))
+
+    def spool_image(self, post):
+        post.image = png_upload()
+        spooled = media.spool_uploads(post, ['image'])
+        post.save()
+        media.enqueue(post, spooled)
+        return MediaUploadJob.objects.latest('pk')
+
+    def test_newer_upload_drops_pending_job(self):
+        post = Post.objects.get(pk=self.post.pk)
+        first = self.spool_image(post)
+        with self.captureOnCommitCallbacks(execute=True):
+            second = self.spool_image(post)
+        self.assertFalse(MediaUploadJob.objects.filter(pk=first.pk).exists())
+        self.assertFalse(Path(first.spool_path).exists())
+        self.assertTrue(media.process_job(second.pk))
+
+    def test_older_running_job_does_not_overwrite_newer_upload(self):
+        post = Post.objects.get(pk=self.post.pk)
+        first = self.spool_image(post)
+        # Claimed by a worker that stalled long enough to be retried.
+        MediaUploadJob.objects.filter(pk=first.pk).update(
+            status=MediaUploadJob.Status.RUNNING, locked_at=timezone.now() - timedelta(days=1),
+        )
+        second = self.spool_image(post)
+        media.process_job(second.pk)
+        newest = str(Post.objects.get(pk=post.pk).image)
+
+        media.process_job(first.pk)
+        self.assertEqual(str(Post.objects.get(pk=post.pk).image), newest)
+        self.assertFalse(Path(first.spool_path).exists())
+
+    @override_settings(BLOG_MEDIA_UPLOADER='blog.tests.FailingUploader', BLOG_MEDIA_MAX_ATTEMPTS=1)
+    def test_permanent_failure_removes_spool(self):
+        self.create_post()
+        post = Post.objects.get(title='Photo')
+        job = MediaUploadJob.objects.get(object_id=post.pk)
+        with self.assertLogs('blog.media', 'ERROR'):
+            self.assertFalse(media.process_job(job.pk))
+        job.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual(job.status, MediaUploadJob.Status.FAILED)
+        self.assertEqual(post.media_status, MediaStatus.FAILED)
+        self.assertFalse(Path(job.spool_path).exists())
+
+
+class MetricsEndpointTests(BlogTestCase):
+    @override_settings(BLOG_METRICS_TOKEN='', DEBUG=False)
+    def test_missing_token_hides_the_endpoint(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+
+    @override_settings(BLOG_METRICS_TOKEN='', DEBUG=True)
+    def test_missing_token_is_open_under_debug(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    @override_settings(BLOG_METRICS_TOKEN='s3cret')
+    def test_token_is_required(self):
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer nope').status_code, 403)
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'blog_requests_total', response.content)
+
+    def test_child_exit_without_multiprocess_dir(self):
+        conf = runpy.run_path(str(Path(settings.BASE_DIR) / 'gunicorn.conf.py'))
+        with mock.patch.dict('os.environ'), mock.patch.object(conf['multiprocess'], 'mark_process_dead') as mark:
+            os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+            conf['child_exit'](None, SimpleNamespace(pid=1234))
+            mark.assert_not_called()
+            os.environ['PROMETHEUS_MULTIPROC_DIR'] = '/tmp'
+            conf['child_exit'](None, SimpleNamespace(pid=1234))
+            mark.assert_called_once_with(1234)
+
+
+class DatabasePoolSettingsTests(TestCase):
+    def configure(self, engine):
+        config = {'ENGINE': engine, 'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True}
+        with mock.patch.object(project_settings, 'DATABASE_POOL', True):
+            return project_settings._database(config)
+
+    def test_pool_kwargs(self):
+        config = self.configure('django.db.backends.postgresql')
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        # Build the arguments the way DatabaseWrapper.pool does; a key that
+        # Django also passes would raise "multiple values for keyword argument".
+        kwargs = dict(kwargs={}, open=False, configure=None, check=None, **config['OPTIONS']['pool'])
+        self.assertEqual(kwargs['max_size'], project_settings.DATABASE_POOL_MAX_SIZE)
+        try:
+            from psycopg_pool import ConnectionPool
+        except ImportError:
+            return
+        inspect.signature(ConnectionPool).bind(**kwargs)
+
+    def test_sqlite_is_left_alone(self):
+        config = self.configure('django.db.backends.sqlite3')
+        self.assertEqual(config['CONN_MAX_AGE'], 600)
+        self.assertNotIn('OPTIONS', config)
+
+
+class NotificationTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fans = [User.objects.create_user(f'fan{i}', password='pw') for i in range(3)]
+
+    def like(self, *users):
+        with self.captureOnCommitCallbacks(execute=True):
+            notifications.notify((self.author.pk, user.pk, NotificationVerb.LIKE, self.post.pk) for user in users)
+            notifications.deliver()
+
+    def test_likes_collapse_into_one_row_counting_people(self):
+        self.like(self.reader, self.reader, *self.fans)
+        self.like(self.fans[0], self.reader)
+        row = Notification.objects.get(recipient=self.author)
+        self.assertEqual(row.actor_count, 4)
+        self.assertEqual(row.actor_id, self.fans[-1].pk)
+        self.assertEqual(set(row.actors.values_list('pk', flat=True)), {self.reader.pk, *(fan.pk for fan in self.fans)})
+
+    def test_read_rows_stay_closed(self):
+        self.like(self.reader)
+        with self.captureOnCommitCallbacks(execute=True):
+            notifications.mark_all_read(self.author)
+        self.like(self.reader)
+        self.assertEqual(Notification.objects.filter(recipient=self.author).count(), 2)
+        self.assertEqual(notifications.unread_count(self.author), 1)
+
+    def test_unread_badge(self):
+        self.like(self.reader)
+        self.client.force_login(self.author)
+        self.assertContains(self.client.get(reverse('post_list')), '<span class="notifications-badge">1</span>', html=True)
+        self.like(self.fans[0])
+        # Folding into the open row leaves the count, and the cached badge, as they were.
+        with self.assertNumQueries(0):
+            self.assertEqual(notifications.unread_count(self.author), 1)
+
+    def test_unread_count_is_cached_for_a_minute(self):
+        self.like(self.reader)
+        self.assertEqual(notifications.unread_count(self.author), 1)
+        Notification.objects.update(read=True)
+        self.assertEqual(notifications.unread_count(self.author), 1)
+        later = time.time() + notifications.UNREAD_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertEqual(notifications.unread_count(self.author), 0)
+
+
+def rendered(response) -> str:
+    # Each render gets its own CSRF token.
+    return re.sub(r'name="csrfmiddlewaretoken" value="[^"]*"', '', response.content.decode())
+
+
+class AsyncViewTests(TransactionTestCase):
+    """The async variants render exactly what the sync views do.
+
+    A TransactionTestCase, since ``concurrently`` queries from other threads.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', password='pw')
+        self.reader = User.objects.create_user('reader', password='pw')
+        self.post = Post.objects.create(author=self.author, title='Hello', body='First post.')
+        self.post.toggle_like(self.reader)
+        Comment.objects.create(post=self.post, user=self.reader, body='Nice.')
+
+    def request(self, user, path='/'):
+        request = RequestFactory().get(path)
+        if user.is_authenticated:
+            user = User.objects.get(pk=user.pk)
+        request.user = user
+
+        async def auser():
+            return user
+        request.auser = auser
+        return request
+
+    def assertSameRender(self, sync_view, async_view, *args):
+        for user in (AnonymousUser(), self.reader):
+            with self.subTest(user=user):
+                cache.clear()
+                expected = sync_view(self.request(user), *args)
+                cache.clear()
+                actual = async_to_sync(async_view)(self.request(user), *args)
+                self.assertEqual(actual.status_code, 200)
+                self.assertIn(self.post.title, rendered(actual))
+                self.assertEqual(rendered(actual), rendered(expected))
+
+    def test_post_list(self):
+        self.assertSameRender(views.post_list, async_views.post_list)
+
+    def test_post_detail(self):
+        self.assertSameRender(views.post_detail, async_views.post_detail, self.post.pk)
+
+    def test_worker_queries_are_counted(self):
+        recorder = metrics._QueryRecorder()
+        token = metrics._recorder.set(recorder)
+        try:
+            count, = async_to_sync(concurrently)(Post.objects.count)
+        finally:
+            metrics._recorder.reset(token)
+        self.assertEqual((count, recorder.count), (1, 1))
+
+
+class SearchTests(BlogTestCase):
+    def test_title_matches_rank_above_body_matches(self):
+        self.assertEqual(search.backend(), 'sqlite')
+        in_body = Post.objects.create(author=self.author, title='Notes', body='A long review of Vertigo.')
+        in_title = Post.objects.create(author=self.author, title='Vertigo', body='Hitchcock at his best.')
+        self.assertEqual(search_posts('vertigo').items, [in_title, in_body])
+
+    def test_tags_and_usernames_match(self):
+        self.post.tags.add('noir')
+        self.assertEqual(search_posts('noir').items, [self.post])
+        self.assertEqual(search_posts('author noir').items, [self.post])
+        self.assertEqual(search_posts('reader noir').items, [])
+
+    def test_pages_cover_every_match_once(self):
+        for i in range(5):
+            Post.objects.create(author=self.author, title=f'Heist {i}', body='Heist ' * i)
+        seen, cursor = [], None
+        while True:
+            page = search_posts('heist', cursor, page_size=2)
+            seen += page.items
+            cursor = page.next_cursor
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_view(self):
+        response = self.client.get(reverse('search'), {'q': 'hello'})
+        self.assertEqual(list(response.context['posts']), [self.post])
+        self.assertEqual(self.client.get(reverse('search'), {'q': 'hello', 'cursor': 'junk'}).status_code, 400)
+
+
+@override_settings(BLOG_COMMENTS_PAGE_SIZE=2)
+class ApiTests(BlogTestCase):
+    def test_search(self):
+        response = self.client.get(reverse('api_search'), {'q': 'hello'})
+        self.assertEqual([post['id'] for post in response.json()['results']], [self.post.pk])
+        self.assertEqual(self.client.get(reverse('api_search'), {'q': 'nothing'}).json()['results'], [])
+
+    def test_comment_pages_use_cursor(self):
+        for i in range(5):
+            Comment.objects.create(post=self.post, user=self.reader, body=f'Comment {i}')
+        url = reverse('api_post_comments', args=[self.post.pk])
+        seen, cursor = [], None
+        while True:
+            body = self.client.get(url, {'cursor': cursor} if cursor else {}).json()
+            seen += [comment['body'] for comment in body['results']]
+            cursor = body['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, [f'Comment {i}' for i in reversed(range(5))])
+
+    def test_etag_revalidates(self):
+        url = reverse('api_post_detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.post.toggle_like(self.reader)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ResponsiveImageTests(TestCase):
+    def setUp(self):
+        media_root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=media_root, MEDIA_URL='/media/')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.media_root = media_root
+
+    def upload(self, width):
+        source = self.media_root / 'source.png'
+        source.write_bytes(png_upload(size=(width, 100)).read())
+        value = media.LocalUploader().upload(source, resource_type='image', options={'folder': 'posts'})
+        return Post._meta.get_field('image').to_python(value)
+
+    def srcset(self, sources):
+        return [candidate.rsplit(' ', 1)[1] for candidate in sources['jpg'].split(', ')]
+
+    def test_small_original_is_not_advertised_wider(self):
+        resource = self.upload(500)
+        self.assertTrue(resource.public_id.endswith('_500w'))
+        written = sorted(path.name.rsplit('_w', 1)[1] for path in (self.media_root / 'posts').glob('*_w*.jpg'))
+        self.assertEqual(written, ['320.jpg', '500.jpg', '96.jpg'])
+        uploader = media.LocalUploader()
+        self.assertEqual(self.srcset(uploader.image_sources(resource, (96, 320))), ['96w', '320w'])
+        self.assertEqual(self.srcset(uploader.image_sources(resource, (320, 640))), ['320w', '500w'])
+        sources = uploader.image_sources(resource, (640, 1080))
+        self.assertEqual(self.srcset(sources), ['500w'])
+        self.assertTrue(sources['src'].endswith('_500w_w500.jpg'))
+
+    def test_cloudinary_sources(self):
+        def srcset(public_id):
+            return self.srcset(media.CloudinaryUploader().image_sources(CloudinaryResource(public_id), (640, 1080)))
+        self.assertEqual(srcset('posts/abc_700w'), ['640w', '700w'])
+        # Uploads from before widths were recorded keep every width.
+        self.assertEqual(srcset('posts/abc'), ['640w', '1080w'])
+
+
+class PageCacheTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.logout()
+
+    def assertCached(self, url, cached=True):
+        self.assertEqual(self.client.get(url).get('X-Page-Cache') == 'hit', cached)
+
+    def test_feed_follows_its_posts_and_authors(self):
+        url = reverse('post_list')
+        self.client.get(url)
+        self.assertCached(url)
+        self.post.toggle_like(self.reader)
+        self.assertCached(url, False)
+        self.assertCached(url)
+        self.author.profile.save()
+        self.assertCached(url, False)
+        # Another author's stats say nothing about this page.
+        pagecache.invalidate(pagecache.user_tag(self.reader.pk))
+        self.assertCached(url)
+
+    def test_post_detail(self):
+        url = reverse('post_detail', args=[self.post.pk])
+        self.client.get(url)
+        self.assertCached(url)
+        Comment.objects.create(post=self.post, user=self.reader, body='Nice.')
+        self.assertCached(url, False)
+
+    def test_logged_in_pages_are_not_cached(self):
+        self.client.force_login(self.reader)
+        url = reverse('post_list')
+        self.client.get(url)
+        self.assertCached(url, False)
+
+
+class StoryTrayTests(BlogTestCase):
+    def story(self, author, *, minutes_ago=0, **fields):
+        story = Story.objects.create(author=author, image='image/upload/stories/images/s.jpg', **fields)
+        Story.objects.filter(pk=story.pk).update(created_at=timezone.now() - timedelta(minutes=minutes_ago))
+        return story
+
+    def test_latest_live_story_per_followed_author(self):
+        stranger = User.objects.create_user('stranger', password='pw')
+        self.author.profile.followers.add(self.reader)
+        self.story(self.author, minutes_ago=30)
+        latest = self.story(self.author, minutes_ago=5)
+        self.story(self.author, media_status=MediaStatus.PROCESSING)
+        self.story(stranger)
+        expired = self.story(self.author)
+        Story.objects.filter(pk=expired.pk).update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        response = self.client.get(reverse('post_list'))
+        self.assertEqual(response.context['stories'], [latest])
+        api = self.client.get(reverse('api_story_tray')).json()
+        self.assertEqual([story['id'] for story in api['results']], [latest.pk])
+
+    def test_anonymous_tray_is_empty(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('post_list')).context['stories'], [])
+
+
+class TagIndexTests(BlogTestCase):
+    def counts(self):
+        return dict(TagCount.objects.values_list('tag__name', 'post_count'))
+
+    def test_index_follows_tag_edits_and_deletes(self):
+        other = Post.objects.create(author=self.author, title='Other', body='Body')
+        self.post.tags.add('noir', 'drama')
+        other.tags.add('noir')
+        self.assertEqual(self.counts(), {'noir': 2, 'drama': 1})
+        self.post.tags.remove('drama')
+        self.assertEqual(self.counts(), {'noir': 2, 'drama': 0})
+        other.delete()
+        self.assertEqual(self.counts(), {'noir': 1, 'drama': 0})
+        self.assertEqual(list(TagPost.objects.values_list('post_id', 'tag__name')), [(self.post.pk, 'noir')])
+        self.assertEqual([tag.tag.name for tag in trending_tags()], ['noir'])
+
+    @override_settings(BLOG_FEED_PAGE_SIZE=2)
+    def test_tag_feed_pages(self):
+        for i in range(3):
+            Post.objects.create(author=self.author, title=f'Tagged {i}', body='Body').tags.add('noir')
+        response = self.client.get(reverse('tag_feed', args=['noir']))
+        self.assertEqual([post.title for post in response.context['posts']], ['Tagged 2', 'Tagged 1'])
+        more = self.client.get(reverse('tag_feed_page', args=['noir']), {'cursor': response.context['next_cursor']})
+        self.assertEqual([post.title for post in more.context['posts']], ['Tagged 0'])
+        self.assertNotIn('X-Next-Cursor', more)
+
+
+class TrendingTests(BlogTestCase):
+    def test_half_life(self):
+        half_life = settings.BLOG_TRENDING_HALF_LIFE_HOURS * 3600
+        older, newer = trending.compute_scores([3, 1], [0, 0], [0, 0], [0, half_life])
+        # Engagement of 3 (ln 4) a half-life earlier ties with engagement of 1 (ln 2) now.
+        self.assertAlmostEqual(older, newer)
+
+    def test_interactions_rescore_and_rebuild_agrees(self):
+        quiet = Post.objects.create(author=self.author, title='Quiet', body='Body')
+        Post.objects.filter(pk=self.post.pk).update(publish=quiet.publish)
+        self.post.refresh_from_db()
+        old = Post.objects.create(author=self.author, title='Old', body='Body')
+        Post.objects.filter(pk=old.pk).update(publish=timezone.now() - timedelta(days=30))
+        self.assertEqual(trending.rebuild(), 2)
+
+        self.post.toggle_like(self.reader)
+        Comment.objects.create(post=self.post, user=self.reader, body='Nice.')
+        scores = dict(TrendingPost.objects.values_list('post_id', 'score'))
+        self.assertGreater(scores[self.post.pk], scores[quiet.pk])
+        self.assertNotIn(old.pk, scores)
+
+        trending.rebuild()
+        self.assertAlmostEqual(TrendingPost.objects.get(post=self.post).score, scores[self.post.pk])
+        response = self.client.get(reverse('trending_feed'))
+        self.assertEqual([post.title for post in response.context['posts']], ['Hello', 'Quiet'])
+
+
+@override_settings(BLOG_COMMENTS_PAGE_SIZE=2)
+class CommentPageTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            Comment.objects.create(post=self.post, user=self.reader, body=f'Comment {i}')
+        Comment.objects.create(post=self.post, user=self.reader, body='Hidden', active=False)
+
+    def test_detail_then_fragments_cover_active_comments(self):
+        response = self.client.get(reverse('post_detail', args=[self.post.pk]))
+        seen = [comment.body for comment in response.context['comments']]
+        cursor = response.context['comments_cursor']
+        while cursor:
+            more = self.client.get(reverse('post_comments', args=[self.post.pk]), {'comments': cursor})
+            seen += [comment.body for comment in more.context['comments']]
+            cursor = more.get('X-Next-Cursor')
+        self.assertEqual(seen, [f'Comment {i}' for i in reversed(range(5))])
+
+    def test_no_javascript_fallback(self):
+        url = reverse('post_detail', args=[self.post.pk])
+        first = self.client.get(url)
+        second = self.client.get(url, {'comments': first.context['comments_cursor']})
+        self.assertEqual([comment.body for comment in second.context['comments']], ['Comment 2', 'Comment 1'])
+
+
+@override_settings(BLOG_ADMIN_BATCH_SIZE=2)
+class AdminTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+
+    def act(self, model, action, pks):
+        url = reverse(f'admin:blog_{model}_changelist')
+        return self.client.post(url, {'action': action, '_selected_action': pks}, follow=True)
+
+    def test_changelists(self):
+        for model in ('post', 'comment', 'story'):
+            with self.subTest(model=model):
+                url = reverse(f'admin:blog_{model}_changelist')
+                self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.get(reverse('admin:blog_post_changelist'), {'author__id__exact': self.author.pk})
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_comment_actions_keep_counts(self):
+        pks = [Comment.objects.create(post=self.post, user=self.reader, body=f'C{i}').pk for i in range(5)]
+        self.act('comment', 'deactivate_comments', pks)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+        self.act('comment', 'activate_comments', pks[:3])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 3)
+
+    def test_purge_expired_stories(self):
+        stories = [Story.objects.create(author=self.author, image='image/upload/s.jpg') for _ in range(3)]
+        Story.objects.filter(pk__in=[story.pk for story in stories[:2]]).update(expires_at=timezone.now())
+        self.act('story', 'purge_expired_stories', [story.pk for story in stories])
+        self.assertEqual(list(Story.objects.values_list('pk', flat=True)), [stories[2].pk])
+
+    def test_chunked_pks(self):
+        for i in range(4):
+            Post.objects.create(author=self.author, title=f'Post {i}', body='Body')
+        chunks = list(chunked_pks(Post.objects.all(), 2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(sum(chunks, []), sorted(Post.objects.values_list('pk', flat=True)))
+
+    def test_paginator_counts_exactly_off_postgres(self):
+        self.assertEqual(EstimatedCountPaginator(Post.objects.order_by('pk'), 10).count, 1)
+
+
+@mock.patch('blog.routers.replica_aliases', return_value=['replica1'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter()
+        self.reads = []
+
+    def view(self, request):
+        self.reads.append(self.router.db_for_read(Post))
+        if request.method == 'POST':
+            self.router.db_for_write(Post)
+        self.reads.append(self.router.db_for_read(Post))
+        return HttpResponse()
+
+    def test_outside_requests_read_the_primary(self, replicas):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_write_pins_the_request_and_the_next_ones(self, replicas):
+        middleware = routers.ReplicaMiddleware(self.view)
+        factory = RequestFactory()
+        self.assertFalse(middleware(factory.get('/')).cookies)
+        response = middleware(factory.post('/'))
+        cookie = response.cookies[routers.PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.BLOG_REPLICA_STICKY_SECONDS)
+
+        follow_up = factory.get('/')
+        follow_up.COOKIES[routers.PIN_COOKIE] = cookie.value
+        middleware(follow_up)
+        self.assertEqual(self.reads, ['replica1', 'replica1', 'default', 'default', 'default', 'default'])
+
+    def test_expired_or_forged_cookie_is_ignored(self, replicas):
+        middleware = routers.ReplicaMiddleware(self.view)
+        expired = signing.get_cookie_signer(salt=routers.PIN_COOKIE).sign(str(time.time() - 1))
+        for value in (expired, 'forged'):
+            request = RequestFactory().get('/')
+            request.COOKIES[routers.PIN_COOKIE] = value
+            middleware(request)
+        self.assertEqual(self.reads, ['replica1'] * 4)
+
+    def test_get_that_writes_switches_to_the_primary(self, replicas):
+        def view(request):
+            self.reads.append(self.router.db_for_read(Post))
+            self.router.db_for_write(Post)
+            self.reads.append(self.router.db_for_read(Post))
+            return HttpResponse()
+        response = routers.ReplicaMiddleware(view)(RequestFactory().get('/'))
+        self.assertEqual(self.reads, ['replica1', 'default'])
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
@@ -0,0 +1,124 @@
+from django.conf import settings
+
+from accounts.models import Profile
+
+from .models import Post, TimelineEntry
+from .pagination import KeysetPage, encode_cursor, keyset_filter
+
+
+# -----------------------------
+#  FAN-OUT ON WRITE
+# -----------------------------
+def _entries_for(post, owner_ids):
+    return [
+        TimelineEntry(owner_id=owner_id, post=post, author_id=post.author_id, publish=post.publish)
+        for owner_id in owner_ids
+    ]
+
+
+def fan_out_post(post):
+    """Copy ``post`` into the timeline of its author and every follower.
+
+    Authors above ``BLOG_FANOUT_MAX_FOLLOWERS`` are switched to fan-out on
+    read instead; their followers pick the post up in ``following_page``.
+    """
+    batch_size = settings.BLOG_FANOUT_BATCH_SIZE
+    TimelineEntry.objects.bulk_create(_entries_for(post, [post.author_id]), ignore_conflicts=True)
+
+    profile, _ = Profile.objects.get_or_create(user_id=post.author_id)
+    if not profile.fanout_on_read:
+        if profile.followers.count() <= settings.BLOG_FANOUT_MAX_FOLLOWERS:
+            follower_ids = profile.followers.values_list('id', flat=True).order_by('id')
+            batch = []
+            for follower_id in follower_ids.iterator(chunk_size=batch_size):
+                batch.append(follower_id)
+                if len(batch) == batch_size:
+                    TimelineEntry.objects.bulk_create(_entries_for(post, batch), ignore_conflicts=True)
+                    batch = []
+            if batch:
+                TimelineEntry.objects.bulk_create(_entries_for(post, batch), ignore_conflicts=True)
+            return
+        Profile.objects.filter(pk=profile.pk).update(fanout_on_read=True)
+
+
+def follow(follower, author):
+    """Backfill ``author``'s recent posts after ``follower`` subscribes."""
+    recent = Post.objects.filter(author=author).order_by('-publish', '-id')[:settings.BLOG_TIMELINE_BACKFILL]
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(owner=follower, post=post, author_id=post.author_id, publish=post.publish)
+            for post in recent
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def unfollow(follower, author):
+    TimelineEntry.objects.filter(owner=follower, author=author).delete()
+
+
+def rebuild(*, batch_size=None) -> int:
+    """Backfill every timeline from the current follow graph; returns rows offered.
+
+    Each author's ``BLOG_TIMELINE_BACKFILL`` most recent posts go into their
+    own timeline and their followers', as if everyone had just followed.
+    Existing rows are kept. Authors above ``BLOG_FANOUT_MAX_FOLLOWERS`` are
+    switched to fan-out on read, like in ``fan_out_post``.
+    """
+    batch_size = batch_size or settings.BLOG_FANOUT_BATCH_SIZE
+    offered = 0
+    author_ids = list(Post.objects.order_by().values_list('author_id', flat=True).distinct())
+    for author_id in author_ids:
+        recent = list(
+            Post.objects.filter(author_id=author_id).order_by('-publish', '-id')
+            .only('id', 'author_id', 'publish')[:settings.BLOG_TIMELINE_BACKFILL]
+        )
+        owner_ids = [author_id]
+        profile, _ = Profile.objects.get_or_create(user_id=author_id)
+        if not profile.fanout_on_read:
+            if profile.followers.count() <= settings.BLOG_FANOUT_MAX_FOLLOWERS:
+                owner_ids += profile.followers.values_list('id', flat=True).order_by('id')
+            else:
+                Profile.objects.filter(pk=profile.pk).update(fanout_on_read=True)
+        for start in range(0, len(owner_ids), batch_size):
+            entries = [entry for post in recent for entry in _entries_for(post, owner_ids[start:start + batch_size])]
+            TimelineEntry.objects.bulk_create(entries, batch_size=batch_size, ignore_conflicts=True)
+            offered += len(entries)
+    return offered
+
+
+# -----------------------------
+#  READ PATH
+# -----------------------------
+def following_page(user, cursor=None, page_size=12) -> KeysetPage:
+    """One page of ``user``'s Following timeline, newest first.
+
+    Reads the materialized rows and merges in posts from followed authors
+    that use fan-out on read, using the same ``(publish, id)`` cursor.
+    """
+    keys = [
+        (publish, post_id)
+        for publish, post_id in keyset_filter(
+            TimelineEntry.objects.filter(owner=user), cursor, keys=('publish', 'post_id')
+        ).values_list('publish', 'post_id')[:page_size + 1]
+    ]
+    read_authors = list(
+        Profile.objects.filter(followers=user, fanout_on_read=True).values_list('user_id', flat=True)
+    )
+    if read_authors:
+        keys += keyset_filter(
+            Post.objects.filter(author_id__in=read_authors), cursor, keys=('publish', 'id')
+        ).values_list('publish', 'id')[:page_size + 1]
+        keys = sorted(set(keys), reverse=True)
+
+    next_cursor = None
+    if len(keys) > page_size:
+        keys = keys[:page_size]
+        next_cursor = encode_cursor(keys[-1])
+    posts = Post.objects.select_related('author', 'author__profile').in_bulk(
+        [post_id for _, post_id in keys]
+    )
+    return KeysetPage(
+        items=[posts[post_id] for _, post_id in keys if post_id in posts],
+        next_cursor=next_cursor,
+    )
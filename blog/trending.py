@@ -0,0 +1,97 @@
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Post, TrendingPost
+
+
+# -----------------------------
+#  TRENDING SCORE
+# -----------------------------
+# score = ln(1 + weighted engagement) + (publish - EPOCH) / tau
+#
+# Engagement is likes, saves and comments weighted by
+# BLOG_TRENDING_WEIGHTS. tau is chosen so that a post published one
+# half-life later needs half the engagement to rank equally. That makes
+# this the log of engagement decayed by age. Unlike an "engagement / age"
+# score, it does not change as time passes: a stored score is only stale
+# once the post's counters move. `rebuild_trending` therefore computes the
+# whole window at once with numpy, and refresh_posts() uses the same formula
+# to rescore just the posts that were liked, saved or commented on.
+
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _tau() -> float:
+    return settings.BLOG_TRENDING_HALF_LIFE_HOURS * 3600 / math.log(2)
+
+
+def compute_scores(likes, saves, comments, publish_ts):
+    """Scores for parallel arrays of counters and publish POSIX timestamps."""
+    weights = settings.BLOG_TRENDING_WEIGHTS
+    engagement = (
+        weights['likes'] * np.asarray(likes, dtype=np.float64)
+        + weights['saves'] * np.asarray(saves, dtype=np.float64)
+        + weights['comments'] * np.asarray(comments, dtype=np.float64)
+    )
+    age = np.asarray(publish_ts, dtype=np.float64) - EPOCH.timestamp()
+    return np.log1p(engagement) + age / _tau()
+
+
+def score_post(post) -> float:
+    return float(compute_scores(
+        [post.like_count], [post.save_count], [post.comment_count], [post.publish.timestamp()]
+    )[0])
+
+
+def window_start():
+    return timezone.now() - timedelta(days=settings.BLOG_TRENDING_WINDOW_DAYS)
+
+
+def _load_recent(since) -> pd.DataFrame:
+    """Counters and publish timestamps of every post published since ``since``."""
+    frame = pd.DataFrame(
+        Post.objects.filter(publish__gte=since).order_by()
+        .values_list('id', 'like_count', 'save_count', 'comment_count', 'publish'),
+        columns=['id', 'likes', 'saves', 'comments', 'publish'],
+    )
+    publish = pd.to_datetime(frame['publish'], utc=True)
+    frame['publish_ts'] = (publish - pd.Timestamp(0, tz='UTC')).dt.total_seconds()
+    return frame
+
+
+def rebuild(*, batch_size=5000) -> int:
+    """Rescore every post in the trending window and replace the table."""
+    since = window_start()
+    recent = _load_recent(since)
+    scores = compute_scores(recent['likes'], recent['saves'], recent['comments'], recent['publish_ts'])
+    rows = [
+        TrendingPost(post_id=int(pk), score=float(value), publish=publish)
+        for pk, value, publish in zip(recent['id'], scores, recent['publish'])
+    ]
+    with transaction.atomic():
+        TrendingPost.objects.all().delete()
+        TrendingPost.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def refresh_posts(posts) -> None:
+    """Rescore ``posts`` after interactions, between full rebuilds."""
+    since = window_start()
+    rows = [
+        TrendingPost(post_id=post.pk, score=score_post(post), publish=post.publish)
+        for post in posts if post.publish >= since
+    ]
+    if rows:
+        TrendingPost.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['post'], update_fields=['score'],
+        )
+
+
+def refresh_post(post) -> None:
+    refresh_posts([post])
@@ -1,20 +1,34 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 # --- IMPORT THE NEW VIEWS ---
 from .views import PostUpdateView, PostDeleteView
 
+# Read-heavy views have async variants for the ASGI run mode (docs/asgi.md).
+read_views = async_views if settings.BLOG_ASYNC_VIEWS else views
+
 urlpatterns = [
-    path('', views.post_list, name='post_list'),
+    path('', read_views.post_list, name='post_list'),
+    path('feed/page/', views.post_list_page, name='post_list_page'),
+    path('following/', views.following_feed, name='following_feed'),
+    path('following/page/', views.following_feed_page, name='following_feed_page'),
+    path('trending/', views.trending_feed, name='trending_feed'),
+    path('trending/page/', views.trending_feed_page, name='trending_feed_page'),
     path('post/new/', views.create_post, name='post_create'),
+    path('tag/<slug:slug>/', views.tag_feed, name='tag_feed'),
+    path('tag/<slug:slug>/page/', views.tag_feed_page, name='tag_feed_page'),
+    path('search/', views.search_view, name='search'),
+    path('notifications/', views.notifications_view, name='notifications'),
     path('story/create/', views.create_story, name='story_create'),
     
     path('story/<str:username>/', views.story_view, name='story_view'),
     
-    path('post/<int:pk>/', views.post_detail, name='post_detail'),
+    path('post/<int:pk>/', read_views.post_detail, name='post_detail'),
     path('post/<int:pk>/like/', views.toggle_like, name='post_toggle_like'),
     path('post/<int:pk>/save/', views.toggle_save, name='post_toggle_save'),
     path('post/<int:pk>/comment/', views.add_comment, name='post_add_comment'),
+    path('post/<int:pk>/comments/', views.post_comments, name='post_comments'),
     
     # --- ADD THESE TWO LINES ---
     path('post/<int:pk>/update/', PostUpdateView.as_view(), name='post_update'),
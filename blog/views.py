@@ -1,99 +1,339 @@
+from django.conf import settings
 from django.contrib import messages
-from django.db.models import Prefetch
 from django.contrib.auth.decorators import login_required
+from django.db import connection
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy  # <-- IMPORT REVERSE_LAZY
 from django.views.decorators.http import require_POST
+
+from accounts.models import Profile
+from accounts.suggestions import suggestions_for
+
+from . import interactions, media, notifications, pagecache
+from .annotations import annotate_viewer_state
 from .forms import CommentForm, PostForm, StoryForm
-from .models import Comment, Post, Story
+from .models import Comment, InteractionIntent, MediaStatus, Notification, Post, Story, TagPost, TrendingPost
+from .pagecache import cache_anonymous, tagged
+from .pagination import paginate_keyset
+from .search import search_posts
+from .tags import trending_tags
+from .timeline import fan_out_post, following_page
 from django.utils import timezone
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import get_user_model
 # --- IMPORTS FOR UPDATE/DELETE ---
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views.generic import UpdateView, DeleteView
+from taggit.models import Tag
 
 
 User = get_user_model()
 
+THEME_COOKIE = "blog_theme"
+DEFAULT_THEME = ("light", "#ff4f70")
+
+
+def theme_preferences(request: HttpRequest) -> tuple:
+    """(theme, accent colour) from the signed appearance cookie.
+
+    Pages never render these; base.html applies the cookie client-side so
+    the markup stays cacheable. Only the settings form pre-fills from it.
+    """
+    value = request.get_signed_cookie(THEME_COOKIE, default="", salt=THEME_COOKIE)
+    theme, _, accent_color = value.partition("|")
+    if theme not in {"light", "dark", "custom"} or not accent_color:
+        return DEFAULT_THEME
+    return theme, accent_color
+
+
 def _theme_context(request: HttpRequest) -> dict:
+    active_theme, accent_color = theme_preferences(request)
     return {
-        "active_theme": request.session.get("theme", "light"),
-        "accent_color": request.session.get("accent_color", "#ff4f70"),
+        "active_theme": active_theme,
+        "accent_color": accent_color,
         "user_profile": getattr(request.user, "profile", None) if request.user.is_authenticated else None,
     }
 
-# --- THIS FUNCTION IS UPDATED ---
-def post_list(request: HttpRequest) -> HttpResponse:
-    posts = list(
-        Post.objects.select_related("author", "author__profile")
-        .prefetch_related(
-            "likes",
-            "saved_by",
-            "tags",
-            Prefetch("comments", queryset=Comment.objects.filter(active=True).select_related("user")),
-        )
-    )
-    for post in posts:
-        post.user_liked = post.is_liked_by(request.user)
-        post.user_saved = post.is_saved_by(request.user)
-        
-    # --- UPDATED STORY LOGIC ---
-    final_stories = [] # Start with an empty list
-    
+
+async def _atheme_context(request: HttpRequest) -> dict:
+    """Async ``_theme_context``: the theme is read inline, the profile through the async ORM."""
+    active_theme, accent_color = theme_preferences(request)
+    user_profile = None
     if request.user.is_authenticated:
-        # 1. Get the Profiles of users the current user is following.
-        #    (Assumes related_name='following' on your Profile's followers field)
-        try:
-            my_followed_profiles = request.user.following.all()
-            
-            # 2. Get the user IDs from those profiles
-            followed_user_ids = my_followed_profiles.values_list('user__id', flat=True)
-
-            # 3. Get active stories *only* from those users
-            active_stories = Story.objects.filter(
-                expires_at__gt=timezone.now(),
-                author__id__in=followed_user_ids
-            ).select_related('author', 'author__profile')
-            
-            # 4. Get just the latest story for each user
-            stories_by_user = {}
-            for story in active_stories:
-                if story.author.id not in stories_by_user:
-                    stories_by_user[story.author.id] = story
-            final_stories = list(stories_by_user.values())
-        except AttributeError:
-            # Fails gracefully if the 'following' relationship isn't set up
-            # (e.g., accounts/models.py Profile model is wrong)
-            final_stories = [] 
-    # --- END UPDATED LOGIC ---
+        user_profile = await Profile.objects.filter(user=request.user).afirst()
+    return {
+        "active_theme": active_theme,
+        "accent_color": accent_color,
+        "user_profile": user_profile,
+    }
 
-    context = {
-        "posts": posts,
+def _feed_posts(request: HttpRequest):
+    return paginate_keyset(
+        Post.objects.select_related("author", "author__profile"),
+        request.GET.get("cursor"),
+        keys=("publish", "id"),
+        page_size=settings.BLOG_FEED_PAGE_SIZE,
+    )
+
+
+def _feed_page(request: HttpRequest):
+    page = _feed_posts(request)
+    annotate_viewer_state(page.items, request.user)
+    return page
+
+
+def _latest_story_per_author(stories):
+    """Reduce ``stories`` to the newest one per author in a single query."""
+    if connection.vendor == "postgresql":
+        latest = stories.order_by("author_id", "-created_at").distinct("author_id")
+    else:
+        latest = stories.annotate(
+            author_rank=Window(
+                RowNumber(), partition_by=F("author_id"), order_by=F("created_at").desc()
+            )
+        ).filter(author_rank=1)
+    return sorted(latest, key=lambda story: story.created_at, reverse=True)
+
+
+def _story_tray(request: HttpRequest) -> list:
+    if not request.user.is_authenticated:
+        return []
+    # Latest active story of each followed author, newest first. Served by
+    # the (author, expires_at, created_at) index on Story.
+    followed_user_ids = request.user.following.values("user_id")
+    active_stories = Story.objects.filter(
+        expires_at__gt=timezone.now(),
+        author_id__in=followed_user_ids,
+        media_status=MediaStatus.READY,
+    ).select_related("author", "author__profile")
+    return _latest_story_per_author(active_stories)
+
+
+def _suggestions(request: HttpRequest) -> list:
+    if not request.user.is_authenticated:
+        return []
+    return suggestions_for(request.user, limit=8)
+
+
+def _feed_context(request: HttpRequest, page, feed: str, stories, tags, suggestions=()) -> dict:
+    return {
+        "posts": page.items,
+        "next_cursor": page.next_cursor,
         "comment_form": CommentForm(),
-        "stories": final_stories,  # This is now the *filtered* list
+        "stories": stories,  # This is now the *filtered* list
+        "active_feed": feed,
+        "feed_url": reverse(feed),
+        "feed_page_url": reverse(f"{feed}_page"),
+        "trending_tags": tags,
+        "suggestions": suggestions,
     }
+
+
+def _render_feed(request: HttpRequest, page, feed: str, suggestions=()) -> HttpResponse:
+    context = _feed_context(request, page, feed, _story_tray(request), trending_tags(), suggestions)
     context.update(_theme_context(request))
     return render(request, "blog/post_list.html", context)
 
 
+def _render_tiles(request: HttpRequest, page, feed: str) -> HttpResponse:
+    """Next page of feed tiles only, for infinite scroll.
+
+    The story tray and layout are never re-rendered; the cursor for the
+    following page travels in the ``X-Next-Cursor`` header.
+    """
+    context = {
+        "posts": page.items,
+        "feed_path": reverse(feed),
+    }
+    response = render(request, "blog/post_tiles.html", context)
+    if page.next_cursor:
+        response["X-Next-Cursor"] = page.next_cursor
+    return response
+
+
+@cache_anonymous
+def post_list(request: HttpRequest) -> HttpResponse:
+    page = _feed_page(request)
+    response = _render_feed(request, page, "post_list", _suggestions(request))
+    # Tiles show counters and avatars, which only invalidate post and user tags.
+    return tagged(response, *pagecache.feed_tags(page.items))
+
+
+def post_list_page(request: HttpRequest) -> HttpResponse:
+    return _render_tiles(request, _feed_page(request), "post_list")
+
+
+def _following_page(request: HttpRequest):
+    page = following_page(
+        request.user,
+        request.GET.get("cursor"),
+        page_size=settings.BLOG_FEED_PAGE_SIZE,
+    )
+    annotate_viewer_state(page.items, request.user)
+    return page
+
+
+@login_required
+def following_feed(request: HttpRequest) -> HttpResponse:
+    return _render_feed(request, _following_page(request), "following_feed")
+
+
+@login_required
+def following_feed_page(request: HttpRequest) -> HttpResponse:
+    return _render_tiles(request, _following_page(request), "following_feed")
+
+
+def _trending_page(request: HttpRequest):
+    # Ranked by the precomputed score; see blog/trending.py.
+    page = paginate_keyset(
+        TrendingPost.objects.select_related("post__author", "post__author__profile"),
+        request.GET.get("cursor"),
+        keys=("score", "post_id"),
+        page_size=settings.BLOG_FEED_PAGE_SIZE,
+    )
+    page.items = [entry.post for entry in page.items]
+    annotate_viewer_state(page.items, request.user)
+    return page
+
+
+def trending_feed(request: HttpRequest) -> HttpResponse:
+    return _render_feed(request, _trending_page(request), "trending_feed")
+
+
+def trending_feed_page(request: HttpRequest) -> HttpResponse:
+    return _render_tiles(request, _trending_page(request), "trending_feed")
+
+
+def _tag_page(request: HttpRequest, tag: Tag):
+    # Served from the denormalized TagPost index: no ContentType join.
+    page = paginate_keyset(
+        TagPost.objects.filter(tag=tag).select_related("post__author", "post__author__profile"),
+        request.GET.get("cursor"),
+        keys=("publish", "post_id"),
+        page_size=settings.BLOG_FEED_PAGE_SIZE,
+    )
+    page.items = [entry.post for entry in page.items]
+    annotate_viewer_state(page.items, request.user)
+    return page
+
+
+def tag_feed(request: HttpRequest, slug: str) -> HttpResponse:
+    tag = get_object_or_404(Tag, slug=slug)
+    page = _tag_page(request, tag)
+    context = {
+        "tag": tag,
+        "posts": page.items,
+        "next_cursor": page.next_cursor,
+        "feed_url": reverse("tag_feed", args=[slug]),
+        "feed_page_url": reverse("tag_feed_page", args=[slug]),
+        "trending_tags": trending_tags(),
+    }
+    context.update(_theme_context(request))
+    return render(request, "blog/tag_feed.html", context)
+
+
+def tag_feed_page(request: HttpRequest, slug: str) -> HttpResponse:
+    tag = get_object_or_404(Tag, slug=slug)
+    page = _tag_page(request, tag)
+    context = {
+        "posts": page.items,
+        "feed_path": reverse("tag_feed", args=[slug]),
+    }
+    response = render(request, "blog/post_tiles.html", context)
+    if page.next_cursor:
+        response["X-Next-Cursor"] = page.next_cursor
+    return response
+
+
+def search_view(request: HttpRequest) -> HttpResponse:
+    query = request.GET.get("q", "").strip()
+    page = search_posts(query, request.GET.get("cursor"), page_size=settings.BLOG_FEED_PAGE_SIZE)
+    annotate_viewer_state(page.items, request.user)
+    context = {
+        "query": query,
+        "posts": page.items,
+        "next_cursor": page.next_cursor,
+    }
+    context.update(_theme_context(request))
+    return render(request, "blog/search.html", context)
+
+
+@login_required
+def notifications_view(request: HttpRequest) -> HttpResponse:
+    """The viewer's notifications, most recently active first.
+
+    Opening the first page marks everything read; rows are shown with the
+    state they had before that.
+    """
+    cursor = request.GET.get("cursor")
+    page = paginate_keyset(
+        Notification.objects.filter(recipient=request.user)
+        .select_related("actor", "post")
+        .only("id", "verb", "actor_count", "read", "updated", "actor__username", "post__title"),
+        cursor,
+        keys=("updated", "id"),
+        page_size=settings.BLOG_NOTIFICATIONS_PAGE_SIZE,
+    )
+    if not cursor:
+        notifications.mark_all_read(request.user)
+    context = {"notifications": page.items, "next_cursor": page.next_cursor}
+    context.update(_theme_context(request))
+    return render(request, "blog/notifications.html", context)
+
+
+def _comments_page(post_id: int, cursor):
+    # Newest first, served by the (post, active, created, id) index.
+    return paginate_keyset(
+        Comment.objects.filter(post_id=post_id, active=True).select_related("user", "user__profile"),
+        cursor,
+        keys=("created", "id"),
+        page_size=settings.BLOG_COMMENTS_PAGE_SIZE,
+    )
+
+
+def _comments_context(post, page) -> dict:
+    return {
+        "comments": page.items,
+        "comments_cursor": page.next_cursor,
+        "comments_url": reverse("post_detail", args=[post.pk]),
+        "comments_page_url": reverse("post_comments", args=[post.pk]),
+    }
+
+
+@cache_anonymous
 def post_detail(request: HttpRequest, pk: int) -> HttpResponse:
     post = get_object_or_404(
-        Post.objects.select_related("author", "author__profile").prefetch_related("tags"),
+        Post.objects.select_related("author", "author__profile"),
         pk=pk,
     )
-    comments = post.comments.filter(active=True).select_related("user")
-    post.user_liked = post.is_liked_by(request.user)
-    post.user_saved = post.is_saved_by(request.user)
+    comments = _comments_page(post.pk, request.GET.get("comments"))
+    annotate_viewer_state([post], request.user)
 
     context = {
         "post": post,
-        "comments": comments,
         "comment_form": CommentForm(),
     }
+    context.update(_comments_context(post, comments))
     context.update(_theme_context(request))
-    return render(request, "blog/post_detail.html", context)
+    response = render(request, "blog/post_detail.html", context)
+    return tagged(response, pagecache.post_tag(post.pk), pagecache.user_tag(post.author_id))
+
+
+def post_comments(request: HttpRequest, pk: int) -> HttpResponse:
+    """Next page of a post's comments only, for "load more".
+
+    The cursor for the following page travels in the ``X-Next-Cursor``
+    header, as with the feed fragments.
+    """
+    post = get_object_or_404(Post.objects.only("id"), pk=pk)
+    page = _comments_page(post.pk, request.GET.get("comments"))
+    response = render(request, "blog/comment_list.html", {"comments": page.items})
+    if page.next_cursor:
+        response["X-Next-Cursor"] = page.next_cursor
+    return response
 
 
 @login_required
@@ -103,9 +343,15 @@ def create_post(request: HttpRequest) -> HttpResponse:
         if form.is_valid():
             post = form.save(commit=False)
             post.author = request.user
+            spooled = media.spool_uploads(post, ["image", "video"])
             post.save()
             form.save_m2m()
-            messages.success(request, "Your post is live!")
+            media.enqueue(post, spooled)
+            fan_out_post(post)
+            if spooled:
+                messages.success(request, "Your post is live! Your media will appear once it finishes uploading.")
+            else:
+                messages.success(request, "Your post is live!")
             return redirect("post_detail", pk=post.pk)
     else:
         form = PostForm()
@@ -121,7 +367,9 @@ def create_story(request: HttpRequest) -> HttpResponse:
         if form.is_valid():
             story = form.save(commit=False)
             story.author = request.user
+            spooled = media.spool_uploads(story, ["image"])
             story.save()
+            media.enqueue(story, spooled)
             messages.success(request, "Your story is live for 24 hours!")
             return redirect("post_list") # Go back home
     else:
@@ -131,13 +379,17 @@ def create_story(request: HttpRequest) -> HttpResponse:
     context.update(_theme_context(request))
     return render(request, "blog/story_form.html", context)
 
+@cache_anonymous
 def story_view(request: HttpRequest, username: str) -> HttpResponse:
     story_user = get_object_or_404(User, username=username)
     
-    active_stories = Story.objects.filter(
-        author=story_user,
-        expires_at__gt=timezone.now()
-    ).select_related('author', 'author__profile')
+    active_stories = list(
+        Story.objects.filter(
+            author=story_user,
+            expires_at__gt=timezone.now(),
+            media_status=MediaStatus.READY,
+        ).select_related('author', 'author__profile')
+    )
 
     if not active_stories:
         messages.info(request, f"{username} has no active stories.")
@@ -148,17 +400,14 @@ def story_view(request: HttpRequest, username: str) -> HttpResponse:
         "stories": active_stories,
     }
     context.update(_theme_context(request))
-    return render(request, "blog/story_detail.html", context)
+    response = render(request, "blog/story_detail.html", context)
+    return tagged(response, pagecache.user_tag(story_user.pk))
 
 
 @login_required
 @require_POST
 def toggle_like(request: HttpRequest, pk: int) -> HttpResponse:
-    post = get_object_or_404(Post, pk=pk)
-    if post.is_liked_by(request.user):
-        post.likes.remove(request.user)
-    else:
-        post.likes.add(request.user)
+    interactions.toggle(request.user, pk, InteractionIntent.Kind.LIKE)
     next_url = request.POST.get("next") or reverse("post_detail", args=[pk])
     return redirect(next_url)
 
@@ -166,11 +415,7 @@ def toggle_like(request: HttpRequest, pk: int) -> HttpResponse:
 @login_required
 @require_POST
 def toggle_save(request: HttpRequest, pk: int) -> HttpResponse:
-    post = get_object_or_404(Post, pk=pk)
-    if post.is_saved_by(request.user):
-        post.saved_by.remove(request.user)
-    else:
-        post.saved_by.add(request.user)
+    interactions.toggle(request.user, pk, InteractionIntent.Kind.SAVE)
     next_url = request.POST.get("next") or reverse("post_detail", args=[pk])
     return redirect(next_url)
 
@@ -210,7 +455,7 @@ def register(request: HttpRequest) -> HttpResponse:
 @require_POST
 def set_theme(request: HttpRequest) -> HttpResponse:
     theme = request.POST.get("theme", "light")
-    accent_color = request.POST.get("accent_color") or request.session.get("accent_color", "#ff4f70")
+    accent_color = request.POST.get("accent_color") or theme_preferences(request)[1]
 
     if not isinstance(accent_color, str) or not accent_color.startswith("#"):
         accent_color = "#ff4f70"
@@ -220,13 +465,16 @@ def set_theme(request: HttpRequest) -> HttpResponse:
     if theme not in {"light", "dark", "custom"}:
         theme = "light"
 
-    request.session["theme"] = theme
-    request.session["accent_color"] = accent_color
-
     messages.success(request, "Your appearance preferences have been updated.")
 
     next_url = request.POST.get("next") or request.META.get("HTTP_REFERER") or reverse("settings")
-    return redirect(next_url)
+    response = redirect(next_url)
+    # Not HttpOnly: the script in base.html reads it to apply the theme.
+    response.set_signed_cookie(
+        THEME_COOKIE, f"{theme}|{accent_color}", salt=THEME_COOKIE,
+        max_age=365 * 24 * 60 * 60, secure=request.is_secure(), samesite="Lax",
+    )
+    return response
 
 # -----------------------------------------------
 # --- ADD THESE NEW CLASSES FOR UPDATE & DELETE ---
@@ -240,7 +488,10 @@ class PostUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
 
     def form_valid(self, form):
         form.instance.author = self.request.user
-        return super().form_valid(form)
+        spooled = media.spool_uploads(form.instance, ["image", "video"])
+        response = super().form_valid(form)
+        media.enqueue(self.object, spooled)
+        return response
 
     def test_func(self):
         # Get the post we're trying to update
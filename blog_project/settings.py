@@ -40,6 +40,8 @@ INSTALLED_APPS = [
 
 # --- MIDDLEWARE ---
 MIDDLEWARE = [
+    'blog.metrics.MetricsMiddleware',
+    'blog.routers.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -55,7 +57,8 @@ ROOT_URLCONF = 'blog_project.urls'
 # --- TEMPLATES ---
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates plus per-template render timing for /metrics.
+        'BACKEND': 'blog.metrics.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -64,6 +67,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'blog.context_processors.unread_notifications',
             ],
         },
     },
@@ -72,11 +76,65 @@ TEMPLATES = [
 WSGI_APPLICATION = 'blog_project.wsgi.application'
 
 # --- DATABASES ---
+# DATABASE_POOL=True replaces persistent per-thread connections with a
+# psycopg 3 connection pool in each worker process (PostgreSQL only; see
+# docs/pooling.md). Size it to the concurrent queries a worker can run.
+DATABASE_POOL = os.environ.get('DATABASE_POOL', 'False') == 'True'
+DATABASE_POOL_MIN_SIZE = int(os.environ.get('DATABASE_POOL_MIN_SIZE', 2))
+DATABASE_POOL_MAX_SIZE = int(os.environ.get('DATABASE_POOL_MAX_SIZE', 8))
+# Seconds a request waits for a free pooled connection before failing.
+DATABASE_POOL_TIMEOUT = float(os.environ.get('DATABASE_POOL_TIMEOUT', 10))
+
+
+def _database(config):
+    if DATABASE_POOL and config.get('ENGINE') == 'django.db.backends.postgresql':
+        # Pooled connections go back to the pool at the end of each request.
+        config['CONN_MAX_AGE'] = 0
+        # With a pool, Django passes ConnectionPool.check_connection as the
+        # pool's `check`, so each connection is pinged before it is handed
+        # out and one dropped by the server or a failover is replaced.
+        config['CONN_HEALTH_CHECKS'] = True
+        config.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DATABASE_POOL_MIN_SIZE,
+            'max_size': DATABASE_POOL_MAX_SIZE,
+            'timeout': DATABASE_POOL_TIMEOUT,
+            'max_idle': 300,
+            'max_lifetime': 1800,
+        }
+    return config
+
+
 DATABASES = {
-    'default': dj_database_url.config(
+    'default': _database(dj_database_url.config(
         default=os.environ.get('DATABASE_URL'),
-        conn_max_age=600
-    )
+        conn_max_age=600,
+        conn_health_checks=True,
+    ))
+}
+# Read replicas, comma-separated: DATABASE_REPLICA_URLS=postgres://...,postgres://...
+# Safe requests read from them unless the user wrote recently (blog/routers.py).
+for _index, _url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(','))):
+    DATABASES[f'replica{_index + 1}'] = {
+        **_database(dj_database_url.parse(_url.strip(), conn_max_age=600, conn_health_checks=True)),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['blog.routers.PrimaryReplicaRouter']
+
+# --- CACHES ---
+# Page-cache tag versions, fragment build locks, pending like/save flags and
+# unread badge counts are written by one process and read by all the others
+# (web workers, flush_interactions, run_media_worker, deliver_notifications),
+# so production needs a shared cache: CACHE_URL=redis://host:6379/0. Without
+# it each process keeps its own in-memory cache, which is only correct for a
+# single-process dev server; `check --deploy` fails on it (blog/checks.py).
+CACHE_URL = os.environ.get('CACHE_URL', '')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_URL,
+    } if CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
 }
 
 # --- PASSWORD VALIDATORS ---
@@ -120,3 +178,76 @@ LOGIN_URL = 'login'
 # --- OTHER ---
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 TAGGIT_CASE_INSENSITIVE = True
+
+# --- BLOG ---
+BLOG_FEED_PAGE_SIZE = int(os.environ.get('BLOG_FEED_PAGE_SIZE', 12))
+# Comments per "load more" page on post detail, newest first.
+BLOG_COMMENTS_PAGE_SIZE = 20
+# Posts per page of the public profile grid (three per row).
+BLOG_PROFILE_PAGE_SIZE = 18
+# Rows per page of each tab on the owner's profile (posts, liked, saved, comments).
+BLOG_PROFILE_TAB_PAGE_SIZE = 20
+# Authors with more followers than this are read-merged, not fanned out.
+BLOG_FANOUT_MAX_FOLLOWERS = int(os.environ.get('BLOG_FANOUT_MAX_FOLLOWERS', 10000))
+BLOG_FANOUT_BATCH_SIZE = 1000
+# Recent posts copied into a timeline when its owner follows someone.
+BLOG_TIMELINE_BACKFILL = 50
+# Trending feed (blog/trending.py): posts this recent are ranked, and
+# engagement counts half as much for every half-life of age.
+BLOG_TRENDING_WINDOW_DAYS = 7
+BLOG_TRENDING_HALF_LIFE_HOURS = 12
+BLOG_TRENDING_WEIGHTS = {'likes': 1.0, 'saves': 2.0, 'comments': 3.0}
+# Rendered post tiles/detail bodies, keyed by post id + Post.version.
+BLOG_FRAGMENT_CACHE_TIMEOUT = 60 * 60
+# Anonymous full-page cache (blog/pagecache.py): entries live this long
+# server-side; browsers and shared caches may reuse a page for MAX_AGE.
+BLOG_PAGE_CACHE_TIMEOUT = 5 * 60
+BLOG_PAGE_CACHE_MAX_AGE = 60
+# Route post_list, post_detail and public_profile_view to their async
+# variants; only worthwhile under ASGI (see docs/asgi.md).
+BLOG_ASYNC_VIEWS = os.environ.get('BLOG_ASYNC_VIEWS', 'False') == 'True'
+# Background media uploads (blog/media.py). LocalUploader is an offline
+# stand-in that writes under MEDIA_ROOT instead of calling Cloudinary.
+BLOG_MEDIA_UPLOADER = os.environ.get('BLOG_MEDIA_UPLOADER', 'blog.media.CloudinaryUploader')
+BLOG_MEDIA_SPOOL_DIR = Path(os.environ.get('BLOG_MEDIA_SPOOL_DIR', BASE_DIR / 'media' / 'spool'))
+BLOG_MEDIA_MAX_ATTEMPTS = 5
+BLOG_MEDIA_RETRY_DELAY = 30  # seconds, doubled after each failed attempt
+BLOG_MEDIA_JOB_TIMEOUT = 15 * 60  # a running job older than this is retried
+# Run uploads in-process right after commit instead of via run_media_worker.
+BLOG_MEDIA_EAGER = os.environ.get('BLOG_MEDIA_EAGER', 'False') == 'True'
+# Like/save toggles are appended to a buffer and applied in batches by
+# flush_interactions (blog/interactions.py). Off by default: each toggle is
+# applied inside its request. Only turn it on where flush_interactions runs
+# and CACHE_URL points at a shared cache.
+BLOG_INTERACTIONS_BUFFERED = os.environ.get('BLOG_INTERACTIONS_BUFFERED', 'False') == 'True'
+BLOG_INTERACTIONS_BATCH_SIZE = 1000
+# Notifications (blog/notifications.py): delivered in batches by
+# deliver_notifications, or in-process right after commit when EAGER.
+# Unread notifications younger than COLLAPSE_HOURS absorb new events of
+# the same kind ("X and 41 others liked your post").
+BLOG_NOTIFICATIONS_EAGER = os.environ.get('BLOG_NOTIFICATIONS_EAGER', 'False') == 'True'
+BLOG_NOTIFICATION_BATCH_SIZE = 1000
+BLOG_NOTIFICATION_COLLAPSE_HOURS = 24
+BLOG_NOTIFICATIONS_PAGE_SIZE = 30
+
+# Widths (px) of the derivatives generated for every uploaded image, and the
+# subset plus `sizes` hint each template slot uses in its srcset.
+BLOG_IMAGE_WIDTHS = (96, 320, 640, 1080)
+BLOG_IMAGE_PRESETS = {
+    'avatar': {'widths': (96, 320), 'sizes': '48px'},
+    'tile': {'widths': (320, 640), 'sizes': '(max-width: 640px) 100vw, 320px'},
+    'detail': {'widths': (640, 1080), 'sizes': '(max-width: 1080px) 100vw, 1080px'},
+    'story': {'widths': (640, 1080), 'sizes': '(max-width: 640px) 100vw, 640px'},
+}
+
+# After a write, the user's reads stay on the primary this long.
+BLOG_REPLICA_STICKY_SECONDS = int(os.environ.get('BLOG_REPLICA_STICKY_SECONDS', 15))
+
+# Admin changelists on Postgres show the planner's row estimate instead of
+# COUNT(*) above this many rows; bulk actions update/delete in chunks.
+BLOG_ADMIN_EXACT_COUNT_LIMIT = 10000
+BLOG_ADMIN_BATCH_SIZE = 5000
+
+# Bearer token required by /metrics. Left empty, /metrics is a 404 unless
+# DEBUG is on.
+BLOG_METRICS_TOKEN = os.environ.get('BLOG_METRICS_TOKEN', '')
@@ -0,0 +1,13 @@
+# Picked up automatically by `gunicorn` when run from the project root.
+# With PROMETHEUS_MULTIPROC_DIR set, each worker writes its metrics to that
+# directory and /metrics aggregates them; clear it before starting.
+import os
+
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    # Errors raised here are not caught by the arbiter and would stop the
+    # master, so only touch the directory when multiprocess mode is on.
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(worker.pid)